@@ -1 +1,11 @@
-from pupsis.pupsis import PUPSIS
+__all__ = ["PUPSIS", "AsyncPUPSIS"]
+
+
+def __getattr__(name):
+    # importing the client loads the scrapers and the session store, so
+    # `import pupsis.scrapers.grades` alone stays light
+    if name in __all__:
+        from pupsis import pupsis
+
+        return getattr(pupsis, name)
+    raise AttributeError(f"module 'pupsis' has no attribute {name!r}")
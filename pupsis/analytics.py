@@ -0,0 +1,215 @@
+from array import array
+from typing import Hashable, Iterable, Optional, Union
+
+from pupsis.scrapers.grades import Grade, GradesWrapper, is_excluded
+
+try:
+    import numpy
+except ImportError:  # the `analytics` extra, the pure Python columns give the same results
+    numpy = None
+
+
+SEMESTER_ORDER = {"First": 0, "Second": 1, "Summer": 2}
+
+NAN = float("nan")
+
+
+class GradeTable:
+    """Grades of many students as columns, for GPA, completion and grade distributions in bulk.
+
+    Every grade entry is one row. Students and terms are stored as integer
+    codes into `students` and `terms`, units and grades as float columns with
+    NaN for non-numeric grades ("P", "INC", missing). The queries group the
+    columns by code in one pass, with `numpy.bincount` when NumPy is
+    installed (the `analytics` extra, `pip install pupsis.py[analytics]`)
+    and with plain loops over the arrays otherwise.
+
+    NSTP and PATHFIT subjects (`CWTS`, `ROTC`, `NSTP`, `PATHFIT` codes) are
+    flagged when loaded, see `is_excluded`, and left out of the GPA unless
+    `exclude=False`.
+
+    Attributes:
+        students (list): Student keys, indexed by the `student` column.
+        terms (list): `(Academic_Year, Semester)` of the terms, indexed by the `term` column.
+        student (array): Student code of each row.
+        term (array): Term code of each row.
+        subject (list): Subject code of each row.
+        units (array): Units of each row, 0 when missing.
+        grade (array): Numeric final grade of each row, NaN otherwise.
+        status (list): Grade status of each row.
+        excluded (array): 1 for NSTP and PATHFIT rows.
+        graded (array): 1 for rows with a final grade, numeric or not.
+
+    Example:
+    >>> table = GradeTable.from_grades({number: Grade(html) for number, html in pages.items()})
+    >>> table.cumulative_gpa()
+    {'2020-12345-MN-0': 1.61, ...}
+    >>> table.gpa_by_term()["2020-12345-MN-0"]
+    {('2023', 'First'): 1.5, ('2023', 'Second'): 1.75}
+    >>> table.distribution()
+    {1.0: 120, 1.25: 340, ...}
+    """
+
+    def __init__(self):
+        self.students = []
+        self.terms = []
+        self._student_codes = {}
+        self._term_codes = {}
+
+        self.student = array("l")
+        self.term = array("l")
+        self.subject = []
+        self.units = array("d")
+        self.grade = array("d")
+        self.status = []
+        self.excluded = array("b")
+        self.graded = array("b")
+
+    @classmethod
+    def from_grades(cls, grades: dict):
+        """Builds a table from `{student: Grade}`, a list of `GradesWrapper` is also accepted."""
+        table = cls()
+        for student, semesters in grades.items():
+            table.add(student, semesters)
+        return table
+
+    def __len__(self):
+        return len(self.subject)
+
+    def _code(self, codes: dict, values: list, key) -> int:
+        code = codes.get(key)
+        if code is None:
+            code = codes[key] = len(values)
+            values.append(key)
+        return code
+
+    def add(self, student: Hashable, grades: Union[Grade, Iterable[GradesWrapper]]):
+        """Appends the grades of a student, every semester of a `Grade` or the given ones."""
+        student_code = self._code(self._student_codes, self.students, student)
+        for semester in grades.all() if isinstance(grades, Grade) else grades:
+            term_code = self._code(self._term_codes, self.terms, (semester.Academic_Year, semester.Semester))
+            for entry in semester.grades:
+                units, grade = entry.Units, entry.Final_Grade
+                self.student.append(student_code)
+                self.term.append(term_code)
+                self.subject.append(entry.Subject_Code)
+                self.units.append(units if isinstance(units, float) else 0.0)
+                self.grade.append(grade if isinstance(grade, float) else NAN)
+                self.status.append(entry.Grade_Status)
+                self.excluded.append(is_excluded(entry.Subject_Code or ""))
+                self.graded.append(grade is not None)
+
+    def _gpa_weights(self, exclude: bool):
+        """Units of the rows that count towards the GPA, 0 for the others, with the grade points."""
+        if numpy is not None:
+            units, grade = numpy.asarray(self.units), numpy.asarray(self.grade)
+            counted = ~numpy.isnan(grade)
+            if exclude:
+                counted &= numpy.asarray(self.excluded) == 0
+            weights = numpy.where(counted, units, 0.0)
+            return weights, numpy.where(counted, grade, 0.0) * weights
+
+        weights = array("d", [
+            units if grade == grade and not (exclude and excluded) else 0.0
+            for units, grade, excluded in zip(self.units, self.grade, self.excluded)
+        ])
+        points = array("d", [weight * grade if weight else 0.0 for weight, grade in zip(weights, self.grade)])
+        return weights, points
+
+    def _group_sums(self, keys, size: int, *columns) -> list:
+        """Sums each column by group key, keys are integers below `size`."""
+        if numpy is not None:
+            keys = numpy.asarray(keys)
+            return [numpy.bincount(keys, weights=column, minlength=size).tolist() for column in columns]
+
+        sums = [[0.0] * size for _ in columns]
+        for index, key in enumerate(keys):
+            for total, column in zip(sums, columns):
+                total[key] += column[index]
+        return sums
+
+    def _ordered_terms(self) -> list:
+        """Term codes from the oldest to the newest."""
+        return sorted(
+            range(len(self.terms)),
+            key=lambda code: (self.terms[code][0], SEMESTER_ORDER.get(self.terms[code][1], len(SEMESTER_ORDER))),
+        )
+
+    def gpa_by_term(self, exclude: bool = True, round_off: Optional[int] = None) -> dict:
+        """GPA of every student and term, weighted by units.
+
+        Attributes:
+            exclude (bool): Leave out NSTP and PATHFIT subjects.
+            round_off (int): Round to this many decimals, None keeps full precision.
+
+        Returns:
+            dict: `{student: {(Academic_Year, Semester): gpa}}`, terms oldest first,
+                terms without a numeric grade left out.
+        """
+        weights, points = self._gpa_weights(exclude)
+        size = len(self.terms)
+        if numpy is not None:
+            keys = numpy.asarray(self.student) * size + numpy.asarray(self.term)
+        else:
+            keys = [student * size + term for student, term in zip(self.student, self.term)]
+        units, totals = self._group_sums(keys, len(self.students) * size, weights, points)
+
+        order = self._ordered_terms()
+        result = {}
+        for code, student in enumerate(self.students):
+            base = code * size
+            result[student] = {
+                self.terms[term]: _rounded(totals[base + term] / units[base + term], round_off)
+                for term in order
+                if units[base + term] > 0
+            }
+        return result
+
+    def cumulative_gpa(self, exclude: bool = True, round_off: Optional[int] = None) -> dict:
+        """GPA of every student over all their terms, None for students without a numeric grade."""
+        weights, points = self._gpa_weights(exclude)
+        units, totals = self._group_sums(self.student, len(self.students), weights, points)
+        return {
+            student: _rounded(totals[code] / units[code], round_off) if units[code] > 0 else None
+            for code, student in enumerate(self.students)
+        }
+
+    def completion(self) -> dict:
+        """Share of the entries of every student that have a final grade."""
+        ones = numpy.ones(len(self)) if numpy is not None else array("d", [1.0]) * len(self)
+        graded = numpy.asarray(self.graded, dtype=float) if numpy is not None else array("d", self.graded)
+        totals, done = self._group_sums(self.student, len(self.students), ones, graded)
+        return {student: done[code] / totals[code] if totals[code] else None for code, student in enumerate(self.students)}
+
+    def distribution(self, exclude: bool = False, term: Optional[tuple] = None) -> dict:
+        """Number of entries per numeric final grade, lowest grade first.
+
+        Attributes:
+            exclude (bool): Leave out NSTP and PATHFIT subjects.
+            term (tuple): Only count the `(Academic_Year, Semester)` term.
+        """
+        term_code = self._term_codes.get(term, -1) if term is not None else None
+        if numpy is not None:
+            grade = numpy.asarray(self.grade)
+            selected = ~numpy.isnan(grade)
+            if exclude:
+                selected &= numpy.asarray(self.excluded) == 0
+            if term_code is not None:
+                selected &= numpy.asarray(self.term) == term_code
+            values, counts = numpy.unique(grade[selected], return_counts=True)
+            return dict(zip(values.tolist(), counts.tolist()))
+
+        counts = {}
+        for grade, excluded, code in zip(self.grade, self.excluded, self.term):
+            if grade != grade or (exclude and excluded) or (term_code is not None and code != term_code):
+                continue
+            counts[grade] = counts.get(grade, 0) + 1
+        return dict(sorted(counts.items()))
+
+    def __repr__(self):
+        backend = "numpy" if numpy is not None else "array"
+        return f"<GradeTable of {len(self)} grades, {len(self.students)} students, {len(self.terms)} terms ({backend})>"
+
+
+def _rounded(value: float, round_off: Optional[int]) -> float:
+    return value if round_off is None else round(value, round_off)
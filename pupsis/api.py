@@ -1,25 +1,34 @@
 import hishel
 from selectolax.lexbor import LexborHTMLParser
 from pupsis.utils.logs import Logger
-from pupsis.errors import LoginError, MultipleLoginAttempt
-from typing import Optional
+from pupsis.errors import LoginError, MultipleLoginAttempt, DeadlineExceeded, RetriesExhausted
+from pupsis.utils.pacer import RequestPacer, PacedTransport, AsyncPacedTransport, shared_pacer
+from pupsis.utils.mirrors import MirrorPool, shared_mirrors
+from pupsis.utils.deadline import Deadline
+from pupsis.utils.httpcache import CacheConfig, shared_cache
+from pupsis.utils.metrics import Metrics, shared_metrics, mirror_of
+from pupsis.utils.pool import ConnectionPool, shared_pool
+from pupsis.utils.limiter import AdaptiveLimiter, LimitedTransport, AsyncLimitedTransport, shared_limiter
+from pupsis.utils.retry import Retrier, RetryPolicy, default_retry
+from typing import Optional, Union
+from urllib.parse import urlsplit
 import httpx
-import time, random
+import asyncio
+import time
 
 
-# cache controllers
-controller = hishel.Controller(
-    allow_heuristics=True,
-    force_cache=True,
-)
+class BaseRequester:
+    """Shared configuration and response handling of the sync and async SIS requesters.
 
-storage = hishel.FileStorage(
-    ttl=30,
-    check_ttl_every=10,
-)
+    Subclasses only implement the I/O, the login payload, CSRF extraction and
+    login response checks live here so both clients behave the same.
+    """
 
+    # seconds the CSRF token of a successful login is reused to log in again
+    csrf_ttl = 600.0
+    # class of the message SIS shows with a login refused for wrong credentials
+    login_error_class = "alert-danger"
 
-class APIRequester:
     def __init__(self, 
                  
                 student_number: str, 
@@ -34,89 +43,174 @@ class APIRequester:
                 loglevel: Optional[str] = "INFO",
 
                 # implement delay
-                request_delay: Optional[int] = 0
+                request_delay: Optional[int] = 0,
+                pacer: Optional[RequestPacer] = None,
+
+                # requests in flight per mirror, adapted to how SIS answers
+                limiter: Optional[AdaptiveLimiter] = None,
+
+                # mirror selection
+                mirrors: Optional[MirrorPool] = None,
+
+                # per attempt limits, see `Deadline`
+                connect_timeout: Optional[float] = 10.0,
+                read_timeout: Optional[float] = 100.0,
+
+                # attempts, backoff and Retry-After handling of failed requests
+                retry: Optional[RetryPolicy] = None,
+
+                # http cache storage, ttls and counters
+                cache: Optional[CacheConfig] = None,
+
+                # request, login and step timings
+                metrics: Optional[Metrics] = None,
+
+                # network layer, None borrows the keep-alive connections of `pool`
+                transport: Optional[Union[httpx.BaseTransport, httpx.AsyncBaseTransport]] = None,
+                pool: Optional[ConnectionPool] = None,
 
                 ):
         self.student_number = student_number
         self.student_birthdate = student_birthdate.split("/")
         self.password = password
         self.headers = headers
-        self.logger = Logger("APIRequester", log_file=logfile, level=loglevel)
-        self.urls = [
-            "https://sis8.pup.edu.ph/student/",
-            "https://sis1.pup.edu.ph/student/",
-            "https://sis2.pup.edu.ph/student/",
-        ]
-
-        # request delay
+        self.logger = Logger(type(self).__name__, log_file=logfile, level=loglevel)
+
+        # mirror health is shared by the process, the session is pinned to
+        # the mirror that issued its cookies
+        self.mirrors = mirrors or shared_mirrors
+        self.urls = self.mirrors.urls
+        self.mirror = None
+
+        # request pacing, 0 or less disables it, otherwise the process-wide budget is used
         self.request_delay = request_delay
+        self.pacer = None if request_delay <= 0 else (pacer or shared_pacer)
+        self.limiter = limiter or shared_limiter
+
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retry = retry or default_retry
+        # the `Attempt`s of the last request
+        self.attempts = []
+        self.cache = cache or shared_cache
+        self.transport = transport
+        self.pool = pool or shared_pool
+        self.metrics = metrics or shared_metrics
 
-        # cache controllers
-        self.client = hishel.CacheClient(controller=controller, storage=storage)
         self.session_cookies = None  # Store cookies after login
         self.is_logged_in = False  
 
-    def __client(self, method: str, endpoint: str, data: Optional[dict] = None):
-        timeout = 100
-        for url in self.urls:
-            try:
-                full_url = url + endpoint
-                self.logger.debug(f"Making {method} request to {full_url} with timeout {timeout}s")
+        # (token, mirror, fetched at) of the last successful login, reused to log in again
+        self.csrf = None
+        # successful logins so far, lets a fetch that found its session expired
+        # tell whether another call already logged in again
+        self.generation = 0
 
-                if self.request_delay != 0:
-                    self.logger.debug(f"Delaying request for {random.uniform(0.1, self.request_delay)}s")
-                    time.sleep(random.uniform(0.1, self.request_delay))  # Prevents being detected as a bot
+    def _deadline(self, seconds: Optional[float] = None):
+        """Starts the time budget of a call, None only applies the per attempt limits."""
+        return Deadline(seconds, connect=self.connect_timeout, read=self.read_timeout)
 
-                if method == 'GET':
-                    response = self.client.get(full_url, headers=self.headers, timeout=timeout)
+    def _mirror_order(self):
+        """Mirrors to try for the next request, only the pinned one once a session exists."""
+        if self.mirror is not None:
+            return [self.mirror]
+        return self.mirrors.ordered()
 
-                elif method == 'POST':
-                    response = self.client.post(full_url, data=data, headers=self.headers, timeout=timeout)
+    def _pin_mirror(self, response: httpx.Response):
+        self.mirror = self.mirrors.mirror_for_host(response.url.host)
+        self.logger.debug("Session pinned to %s", self.mirror)
 
-                self.logger.debug(f"Response headers: {response.headers}")
+    def _unpin_mirror(self):
+        """Drops a session whose mirror stopped answering, the next login picks a new mirror."""
+        if self.mirror is not None:
+            self.logger.warning("Lost the session on %s, logging in again on the next request.", self.mirror)
+        self.mirror = None
+        self.is_logged_in = False
 
-                # Store cookies properly
-                self.client.cookies.update(response.cookies)
-                response.raise_for_status()  # Raises exception for non-2xx responses
-                return response
-            
-            except httpx.TimeoutException:
-                self.logger.error(f"Request to {full_url} timed out after {timeout}s.")
-            except httpx.RequestError as e:
-                self.logger.warning(f"Failed to make {method} request to {url}: {e}")
-                continue  
-
-        self.logger.error(f"Failed to make {method} request to all available SIS URLs.")
-        raise LoginError(f"Request failed after trying all SIS URLs.")
-
-    def __session_valid(self):
+    def _attempt_failed(self, retrier: Retrier, method: str, url: str, endpoint: str, waited: float,
+                        start: float, timeout: httpx.Timeout, error: httpx.HTTPError):
+        """Records a failed attempt, returns whether the request may be sent again.
+
+        Raises:
+            httpx.HTTPStatusError: If SIS answered with an error status that is not retried.
+        """
+        # only the last attempt decides whether the request ran out of time or of attempts
+        timed_out = isinstance(error, httpx.TimeoutException)
+        retrier.out_of_budget = timed_out and retrier.deadline.capped(timeout)
+        if timed_out:
+            self.logger.error("Request to %s%s timed out after %.2fs.", url, endpoint, timeout.read)
+        else:
+            self.logger.warning("Failed to make %s request to %s: %s", method, url, error)
+        retry = retrier.failed(url, waited, time.monotonic() - start, error)
+        if not retry and isinstance(error, httpx.HTTPStatusError):
+            self.attempts = retrier.attempts
+            raise error
+        return retry
+
+    def _attempts_done(self, response: httpx.Response, retrier: Retrier):
+        self.attempts = response.extensions["pupsis_attempts"] = retrier.attempts
+        return response
+
+    def _retries_exhausted(self, retrier: Retrier, method: str, step: str):
+        self.attempts = retrier.attempts
+        self._unpin_mirror()
+        if retrier.out_of_budget or retrier.deadline.expired:
+            raise DeadlineExceeded(retrier.deadline.seconds, step, retrier.attempts)
+        self.logger.error("Failed to make %s request after %d attempts.", method, len(retrier.attempts))
+        raise RetriesExhausted(retrier.attempts)
+
+    def _reusable_csrf(self):
+        """Returns the CSRF token of the last login if it is still fresh, pinning its mirror.
+
+        Only a token that already led to a successful login is reused. A login
+        refused with it is only posted again with a new token when SIS shows
+        no credential error, see `_stale_csrf`, so wrong credentials still
+        count one failed login towards `lockaccount`, not two.
         """
-        Checks if the session is still valid by requesting a protected page.
+        if self.csrf is None:
+            return None
+        token, mirror, fetched = self.csrf
+        if time.monotonic() - fetched > self.csrf_ttl or self.mirrors.is_open(mirror):
+            self.csrf = None
+            return None
+        self.mirror = mirror
+        return token
+
+    def _stale_csrf(self, response: httpx.Response):
+        """Checks if a login was refused for its CSRF token rather than the credentials.
+
+        Both send the browser back to the login page, only wrong credentials
+        come with an error message.
         """
-        response = self.__client("GET", "dashboard")  # Assume dashboard requires authentication
-        return response.status_code == 200
-    
-    def __get_csrf_token(self):
-        self.logger.info("Extracting CSRF token")
-        response = self.__client('GET', "")
-        tree = LexborHTMLParser(response.text)
+        return self._login_redirect(response) in self.urls and self.login_error_class not in response.text
+
+    @staticmethod
+    def _login_redirect(response: httpx.Response):
+        """The URL a login or page response sends the browser to, "" if none."""
+        if response.is_redirect:
+            return response.headers.get("Location", "")
+        refresh_header = response.headers.get("Refresh") or ""
+        return refresh_header.split("url=", 1)[-1] if "url=" in refresh_header else ""
+
+    def _session_expired(self, response: httpx.Response):
+        """Checks if a page response sends the browser back to the login page."""
+        redirect = self._login_redirect(response)
+        return bool(redirect) and urlsplit(redirect).path.rstrip("/") == "/student"
+
+    def _expire_session(self, generation: int):
+        """Marks the session as logged out, unless a login since `generation` replaced it."""
+        if generation == self.generation:
+            self.logger.info("Session expired, logging in again")
+            self.is_logged_in = False
+
+    def _parse_csrf_token(self, html: str):
+        tree = LexborHTMLParser(html)
         csrf = [tree.css_first(selector).attrs["value"] for selector in ["input[name='csrf_token']", "input#tempcsrf"]]
-        self.logger.debug(f"CSRF token extracted: {csrf}")
+        self.logger.debug("CSRF token extracted: %s", csrf)
         return tuple(csrf)
 
-
-    def __login(self):
-        """Logs in only if the session is invalid."""
-        self.logger.debug(
-            f"Fetching grades PUPSIS Credentials : {self.student_number} | {self.student_birthdate} | {self.password}"
-        )
-        if self.is_logged_in and self.__session_valid():
-            self.logger.info("Already logged in, session is still valid.")
-            return
-        
-        self.logger.info("Logging in to SIS")
-        csrf = self.__get_csrf_token()
-        payload = {
+    def _login_payload(self, csrf: tuple):
+        return {
             "csrf_token": csrf[0],
             "csrf_token": csrf[1],
             "studno": self.student_number,
@@ -126,31 +220,513 @@ class APIRequester:
             "password": self.password,
             "Login": "Sign in",
         }
-        response = self.__client('POST', "", data=payload)
-        refresh_header = response.headers.get("Refresh")
 
-        if refresh_header == '0;url=https://sis8.pup.edu.ph/student/authentication/lockaccount':
+    def _check_login_response(self, response: httpx.Response):
+        redirect = self._login_redirect(response)
+
+        if redirect.endswith("/student/authentication/lockaccount"):
+            self.metrics.inc("pupsis_logins_total", outcome="locked")
+            self.mirror = None
             raise MultipleLoginAttempt()
         
-        if refresh_header == '0;url=https://sis8.pup.edu.ph/student/':
+        if redirect in self.urls:
+            self.metrics.inc("pupsis_logins_total", outcome="invalid")
             self.logger.error("Failed to login: Incorrect credentials")
+            self.mirror = None
             raise LoginError("Incorrect login credentials")
 
+        self.metrics.inc("pupsis_logins_total", outcome="success")
         self.logger.info("Login successful")
         self.is_logged_in = True
+        self.generation += 1
 
-    def get_grades(self):
-        self.__login()
-        response = self.__client('GET', "grades")
+    def _page_text(self, response: httpx.Response, page: str, as_bytes: bool = False):
         if response.status_code == 200:
-            return response.text
-        self.logger.error(f"Failed to fetch grades: {response.status_code}")
+            # the raw body skips charset detection and decoding, the parsers take bytes
+            return response.content if as_bytes else response.text
+        self.logger.error("Failed to fetch %s: %s", page, response.status_code)
         return None
 
-    def get_schedule(self, save_html: Optional[bool] = False):
-        self.__login()
-        response = self.__client('GET', "schedule")
-        if response.status_code == 200:
-            return response.text
-        self.logger.error(f"Failed to fetch schedule: {response.status_code}")
-        return None
+
+def _network_time(response: httpx.Response) -> Optional[float]:
+    """Seconds from sending a request to SIS to reading its response, None for a response from the cache.
+
+    Starts from the `pupsis_sent` stamp of `LimitedTransport`, so the waits
+    for the pacer and a request slot are not counted as mirror latency.
+    """
+    sent = response.request.extensions.get("pupsis_sent")
+    return None if sent is None else time.perf_counter() - sent
+
+
+class APIRequester(BaseRequester):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # cache controllers, the pacer and limiter sit below the cache so cache
+        # hits skip them, the limiter stamps when the request actually goes out
+        transport = LimitedTransport(self.transport or self.pool.transport(), self.limiter, logger=self.logger)
+        if self.pacer is not None:
+            transport = PacedTransport(transport, self.pacer, logger=self.logger)
+        self.client = hishel.CacheClient(
+            controller=self.cache.controller,
+            storage=self.cache.storage(),
+            transport=transport,
+            event_hooks=self.metrics.request_hooks(),
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Closes the underlying HTTP client, the pooled connections stay open."""
+        self.client.close()
+
+    def __send(self, method: str, url: str, endpoint: str, data: Optional[dict], deadline: Deadline,
+               timeout: httpx.Timeout):
+        """Makes one request to one mirror and reports the outcome to the mirror pool."""
+        full_url = url + endpoint
+        self.logger.debug("Making %s request to %s with timeout %.2fs", method, full_url, timeout.read)
+        # lets the pacer and the limiter give up waiting once the deadline would pass
+        extensions = {"pupsis_deadline": deadline}
+        try:
+            if method == 'GET':
+                response = self.client.get(full_url, headers=self.headers, timeout=timeout, extensions=extensions)
+
+            elif method == 'POST':
+                response = self.client.post(
+                    full_url, data=data, headers=self.headers, timeout=timeout, extensions=extensions
+                )
+
+            self.logger.debug("Response headers: %s", response.headers)
+
+            # Store cookies properly
+            self.client.cookies.update(response.cookies)
+            # an expired session is answered with a redirect to the login page, see `_session_expired`
+            if not response.is_redirect:
+                response.raise_for_status()  # Raises exception for non-2xx responses
+        except httpx.HTTPError as e:
+            self.mirrors.record_failure(url)
+            self.metrics.inc(
+                "pupsis_request_failures_total", mirror=mirror_of(url), endpoint=endpoint or "login", error=type(e).__name__
+            )
+            raise
+
+        latency = _network_time(response)
+        if latency is not None:
+            self.mirrors.record_success(url, latency)
+        return response
+
+    def __client(self, method: str, endpoint: str, data: Optional[dict] = None, deadline: Optional[Deadline] = None):
+        """Sends a request, retrying transient failures as the retry policy allows.
+
+        The deadline also bounds the waits for the request pacer and the
+        limiter, they raise `DeadlineExceeded` instead of sleeping past it.
+
+        The attempts made are kept in `self.attempts` and in the
+        `pupsis_attempts` extension of the response.
+
+        Raises:
+            DeadlineExceeded: If the deadline ran out before a response.
+            RetriesExhausted: If every allowed attempt failed.
+            httpx.HTTPStatusError: If SIS answered with an error status that is not retried.
+        """
+        deadline = deadline or self._deadline()
+        step = f"making {method} request to /{endpoint}"
+        retrier = Retrier(self.retry, method, self._mirror_order(), deadline)
+        while (planned := retrier.next()) is not None:
+            url, wait = planned
+            if retrier.attempts:
+                self.metrics.inc("pupsis_retries_total", endpoint=endpoint or "login")
+            if wait:
+                self.logger.info("Retrying %s /%s on %s in %.2fs", method, endpoint, url, wait)
+                time.sleep(wait)
+            deadline.check(step)
+            timeout = deadline.timeout()
+            start = time.monotonic()
+            try:
+                response = self.__send(method, url, endpoint, data, deadline, timeout)
+            except httpx.HTTPError as e:
+                if not self._attempt_failed(retrier, method, url, endpoint, wait, start, timeout, e):
+                    break
+                continue
+            except DeadlineExceeded as e:
+                # the pacer or the limiter would have waited past the deadline
+                self.attempts = e.attempts = retrier.attempts
+                raise
+            retrier.succeeded(url, wait, time.monotonic() - start)
+            deadline.step_done()
+            return self._attempts_done(response, retrier)
+
+        return self._retries_exhausted(retrier, method, step)
+
+    def __get_csrf_token(self, deadline: Deadline):
+        with self.metrics.timer("pupsis_step_duration_seconds", step="csrf_token"):
+            self.logger.info("Extracting CSRF token")
+            self.mirror = None
+            fetched = time.monotonic()
+            response = self.__client('GET', "", deadline=deadline)
+            # the token belongs to the mirror that served it, so the login post goes there too
+            self._pin_mirror(response)
+            return self._parse_csrf_token(response.text), fetched
+
+    def __post_login(self, csrf: tuple, deadline: Deadline):
+        return self.__client('POST', "", data=self._login_payload(csrf), deadline=deadline)
+
+    def __login(self, deadline: Deadline):
+        """Logs in unless the session is logged in.
+
+        The session is not checked in advance, an expired one is found by the
+        fetch that gets sent to the login page, see `__fetch`. The CSRF token
+        of the previous login is reused while fresh, saving the login page GET.
+        """
+        if self.is_logged_in:
+            return
+        self.logger.debug(
+            "Fetching grades PUPSIS Credentials : %s | %s | %s", self.student_number, self.student_birthdate, self.password
+        )
+        with self.metrics.timer("pupsis_step_duration_seconds", step="login"):
+            self.logger.info("Logging in to SIS")
+            csrf = self._reusable_csrf()
+            if csrf is not None:
+                deadline.plan(1)
+                response = self.__post_login(csrf, deadline)
+                if not self._stale_csrf(response):
+                    self._check_login_response(response)
+                    return
+                self.logger.info("CSRF token expired, fetching a new one")
+                self.csrf = None
+
+            deadline.plan(2)
+            csrf, fetched = self.__get_csrf_token(deadline)
+            response = self.__post_login(csrf, deadline)
+            self._check_login_response(response)
+            self.csrf = (csrf, self.mirror, fetched)
+
+    def __fetch(self, page: str, deadline: Deadline):
+        """GETs an SIS page, logging in first if needed and again if the session expired.
+
+        Raises:
+            LoginError: If the page still sends to the login page after logging in again.
+        """
+        self.__login(deadline)
+        generation = self.generation
+        response = self.__client('GET', page, deadline=deadline)
+        if self._session_expired(response):
+            self._expire_session(generation)
+            self.__login(deadline)
+            deadline.plan(1)
+            response = self.__client('GET', page, deadline=deadline)
+            if self._session_expired(response):
+                raise LoginError(f"SIS ended the session again while fetching {page}")
+        return response
+
+    def get_grades(self, deadline: Optional[float] = None, as_bytes: bool = False):
+        """Fetches the grades page, logging in first if needed.
+
+        A warm session costs one request, an expired one is logged in again
+        and the fetch retried once.
+
+        Attributes:
+            deadline (float): Overall seconds allowed for the login and the fetch.
+            as_bytes (bool): Return the undecoded body.
+
+        Raises:
+            DeadlineExceeded: If the deadline runs out.
+        """
+        deadline = self._deadline(deadline)
+        deadline.plan(1)
+        with self.metrics.timer("pupsis_step_duration_seconds", step="get_grades"):
+            response = self.__fetch("grades", deadline)
+            return self._page_text(response, "grades", as_bytes)
+
+    def get_schedule(self, save_html: Optional[bool] = False, deadline: Optional[float] = None, as_bytes: bool = False):
+        """Fetches the schedule page, logging in first if needed.
+
+        Attributes:
+            deadline (float): Overall seconds allowed for the login and the fetch.
+            as_bytes (bool): Return the undecoded body.
+
+        Raises:
+            DeadlineExceeded: If the deadline runs out.
+        """
+        deadline = self._deadline(deadline)
+        deadline.plan(1)
+        with self.metrics.timer("pupsis_step_duration_seconds", step="get_schedule"):
+            response = self.__fetch("schedule", deadline)
+            return self._page_text(response, "schedule", as_bytes)
+
+class AsyncAPIRequester(BaseRequester):
+    """Asyncio counterpart of `APIRequester`.
+
+    Uses `hishel.AsyncCacheClient` and paces with `asyncio.sleep`, so
+    fetches of many students can share one event loop. Concurrent calls on the
+    same instance share a single login.
+
+    Attributes:
+        hedge_percentile (float): When set, a GET outside of a session that takes
+            longer than this latency percentile (0-100) of its mirror is also sent
+            to the next mirror, and the first response wins.
+
+    Example:
+    >>> async with AsyncAPIRequester("2020-12345-MN-0", "1/02/2003", "mypassword") as api:
+    ...     grades_html, schedule_html = await asyncio.gather(api.get_grades(), api.get_schedule())
+    """
+
+    def __init__(self, *args, hedge_percentile: Optional[float] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hedge_percentile = hedge_percentile
+
+        # cache controllers, the pacer and limiter sit below the cache so cache
+        # hits skip them, the limiter stamps when the request actually goes out
+        transport = AsyncLimitedTransport(self.transport or self.pool.async_transport(), self.limiter, logger=self.logger)
+        if self.pacer is not None:
+            transport = AsyncPacedTransport(transport, self.pacer, logger=self.logger)
+        self.client = hishel.AsyncCacheClient(
+            controller=self.cache.controller,
+            storage=self.cache.async_storage(),
+            transport=transport,
+            event_hooks=self.metrics.async_request_hooks(),
+        )
+        self._login_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """Closes the underlying HTTP client, the pooled connections stay open."""
+        await self.client.aclose()
+
+    async def __send(self, method: str, url: str, endpoint: str, data: Optional[dict], deadline: Deadline,
+                     timeout: httpx.Timeout):
+        """Makes one request to one mirror and reports the outcome to the mirror pool."""
+        full_url = url + endpoint
+        self.logger.debug("Making %s request to %s with timeout %.2fs", method, full_url, timeout.read)
+        # lets the pacer and the limiter give up waiting once the deadline would pass
+        extensions = {"pupsis_deadline": deadline}
+        try:
+            if method == 'GET':
+                response = await self.client.get(full_url, headers=self.headers, timeout=timeout, extensions=extensions)
+
+            elif method == 'POST':
+                response = await self.client.post(
+                    full_url, data=data, headers=self.headers, timeout=timeout, extensions=extensions
+                )
+
+            self.logger.debug("Response headers: %s", response.headers)
+
+            # Store cookies properly
+            self.client.cookies.update(response.cookies)
+            # an expired session is answered with a redirect to the login page, see `_session_expired`
+            if not response.is_redirect:
+                response.raise_for_status()  # Raises exception for non-2xx responses
+        except httpx.HTTPError as e:
+            self.mirrors.record_failure(url)
+            self.metrics.inc(
+                "pupsis_request_failures_total", mirror=mirror_of(url), endpoint=endpoint or "login", error=type(e).__name__
+            )
+            raise
+
+        latency = _network_time(response)
+        if latency is not None:
+            self.mirrors.record_success(url, latency)
+        return response
+
+    async def __hedged(self, urls: list, endpoint: str, deadline: Deadline, timeout: httpx.Timeout):
+        """Sends a GET to the first mirror and, if it is slower than its usual
+        `hedge_percentile` latency, a second one to the next mirror.
+
+        Returns the first successful response and cancels the other request.
+        """
+        delay = self.mirrors.percentile(urls[0], self.hedge_percentile)
+        primary = asyncio.ensure_future(self.__send('GET', urls[0], endpoint, None, deadline, timeout))
+        if delay is None:
+            return await primary
+
+        done, pending = await asyncio.wait({primary}, timeout=delay)
+        if done and primary.exception() is None:
+            return primary.result()
+
+        error = primary.exception() if done else None
+        self.logger.debug("%s slower than %.2fs or failed, hedging to %s", urls[0], delay, urls[1])
+        pending.add(asyncio.ensure_future(self.__send('GET', urls[1], endpoint, None, deadline, timeout)))
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def __client(self, method: str, endpoint: str, data: Optional[dict] = None, deadline: Optional[Deadline] = None):
+        """Sends a request, retrying transient failures as the retry policy allows, see `APIRequester`."""
+        deadline = deadline or self._deadline()
+        step = f"making {method} request to /{endpoint}"
+        urls = self._mirror_order()
+        retrier = Retrier(self.retry, method, urls, deadline)
+
+        # only requests outside of a session can go to another mirror
+        if self.hedge_percentile is not None and method == 'GET' and len(urls) > 1:
+            deadline.check(step)
+            timeout = deadline.timeout()
+            start = time.monotonic()
+            try:
+                response = await self.__hedged(urls[:2], endpoint, deadline, timeout)
+            except httpx.HTTPError as e:
+                self.logger.warning("Failed to make hedged %s request to %s: %s", method, urls[:2], e)
+                if not self._attempt_failed(retrier, method, urls[0], endpoint, 0.0, start, timeout, e):
+                    return self._retries_exhausted(retrier, method, step)
+            except DeadlineExceeded as e:
+                self.attempts = e.attempts = retrier.attempts
+                raise
+            else:
+                retrier.succeeded(str(response.url).removesuffix(endpoint), 0.0, time.monotonic() - start)
+                deadline.step_done()
+                return self._attempts_done(response, retrier)
+
+
+        while (planned := retrier.next()) is not None:
+            url, wait = planned
+            if retrier.attempts:
+                self.metrics.inc("pupsis_retries_total", endpoint=endpoint or "login")
+            if wait:
+                self.logger.info("Retrying %s /%s on %s in %.2fs", method, endpoint, url, wait)
+                await asyncio.sleep(wait)
+            deadline.check(step)
+            timeout = deadline.timeout()
+            start = time.monotonic()
+            try:
+                response = await self.__send(method, url, endpoint, data, deadline, timeout)
+            except httpx.HTTPError as e:
+                if not self._attempt_failed(retrier, method, url, endpoint, wait, start, timeout, e):
+                    break
+                continue
+            except DeadlineExceeded as e:
+                # the pacer or the limiter would have waited past the deadline
+                self.attempts = e.attempts = retrier.attempts
+                raise
+            retrier.succeeded(url, wait, time.monotonic() - start)
+            deadline.step_done()
+            return self._attempts_done(response, retrier)
+
+        return self._retries_exhausted(retrier, method, step)
+
+    async def __get_csrf_token(self, deadline: Deadline):
+        with self.metrics.timer("pupsis_step_duration_seconds", step="csrf_token"):
+            self.logger.info("Extracting CSRF token")
+            self.mirror = None
+            fetched = time.monotonic()
+            response = await self.__client('GET', "", deadline=deadline)
+            # the token belongs to the mirror that served it, so the login post goes there too
+            self._pin_mirror(response)
+            return self._parse_csrf_token(response.text), fetched
+
+    async def __post_login(self, csrf: tuple, deadline: Deadline):
+        return await self.__client('POST', "", data=self._login_payload(csrf), deadline=deadline)
+
+    async def login(self, deadline: Optional[Deadline] = None, expired: Optional[int] = None):
+        """Logs in unless the session is logged in.
+
+        Guarded by a lock so concurrent fetches on the same instance wait for
+        one login instead of each posting their own. The session is not
+        checked in advance, and the CSRF token of the previous login is reused
+        while fresh, see `APIRequester`.
+
+        Attributes:
+            deadline (Deadline): The time budget of the call the login is part of.
+            expired (int): `generation` of a session a fetch found expired, it is
+                dropped unless another login replaced it meanwhile.
+        """
+        deadline = deadline or self._deadline()
+        async with self._login_lock:
+            if expired is not None:
+                self._expire_session(expired)
+            if self.is_logged_in:
+                return
+
+            with self.metrics.timer("pupsis_step_duration_seconds", step="login"):
+                self.logger.info("Logging in to SIS")
+                csrf = self._reusable_csrf()
+                if csrf is not None:
+                    deadline.plan(1)
+                    response = await self.__post_login(csrf, deadline)
+                    if not self._stale_csrf(response):
+                        self._check_login_response(response)
+                        return
+                    self.logger.info("CSRF token expired, fetching a new one")
+                    self.csrf = None
+
+                deadline.plan(2)
+                csrf, fetched = await self.__get_csrf_token(deadline)
+                response = await self.__post_login(csrf, deadline)
+                self._check_login_response(response)
+                self.csrf = (csrf, self.mirror, fetched)
+
+    async def fetch_page(self, page: str, deadline: Optional[Deadline] = None, as_bytes: bool = False):
+        """Fetches an SIS page with the current session.
+
+        If SIS sends the request to the login page, the session is logged in
+        again and the fetch retried once.
+
+        Attributes:
+            page (str): The SIS endpoint, i.e "grades" or "schedule".
+            deadline (Deadline): The time budget of the call the fetch is part of.
+            as_bytes (bool): Return the undecoded body.
+
+        Returns:
+            str: The HTML of the page, or None if the request was not successful.
+
+        Raises:
+            LoginError: If the page still sends to the login page after logging in again.
+        """
+        deadline = deadline or self._deadline()
+        generation = self.generation
+        response = await self.__client('GET', page, deadline=deadline)
+        if self._session_expired(response):
+            await self.login(deadline, expired=generation)
+            deadline.plan(1)
+            response = await self.__client('GET', page, deadline=deadline)
+            if self._session_expired(response):
+                raise LoginError(f"SIS ended the session again while fetching {page}")
+        return self._page_text(response, page, as_bytes)
+
+    async def get_grades(self, deadline: Optional[float] = None, as_bytes: bool = False):
+        """Fetches the grades page, logging in first if needed.
+
+        Attributes:
+            deadline (float): Overall seconds allowed for the login and the fetch.
+            as_bytes (bool): Return the undecoded body.
+
+        Raises:
+            DeadlineExceeded: If the deadline runs out.
+        """
+        deadline = self._deadline(deadline)
+        deadline.plan(1)
+        with self.metrics.timer("pupsis_step_duration_seconds", step="get_grades"):
+            await self.login(deadline)
+            return await self.fetch_page("grades", deadline, as_bytes)
+
+    async def get_schedule(self, deadline: Optional[float] = None, as_bytes: bool = False):
+        """Fetches the schedule page, logging in first if needed.
+
+        Attributes:
+            deadline (float): Overall seconds allowed for the login and the fetch.
+            as_bytes (bool): Return the undecoded body.
+
+        Raises:
+            DeadlineExceeded: If the deadline runs out.
+        """
+        deadline = self._deadline(deadline)
+        deadline.plan(1)
+        with self.metrics.timer("pupsis_step_duration_seconds", step="get_schedule"):
+            await self.login(deadline)
+            return await self.fetch_page("schedule", deadline, as_bytes)
@@ -0,0 +1,112 @@
+import glob
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from pupsis.scrapers.grades import Grade
+from pupsis.scrapers.schedule import Schedule
+from pupsis.utils import get_stream_file
+
+
+HTML_SUFFIXES = (".html", ".htm")
+
+
+def detect_page(html_data: bytes) -> Optional[str]:
+    """Returns the type of a saved SIS page, "grades", "schedule" or None if unknown."""
+    if b"card-theme" in html_data:
+        return "grades"
+    if b'id="Subject"' in html_data or b"Faculty:" in html_data:
+        return "schedule"
+    return None
+
+
+def parse_file(path: str) -> dict:
+    """Parses one saved SIS page into a JSON serializable result.
+
+    Returns:
+        dict: `{"path", "type", "data"}`, or `{"path", "error"}` if the file could not be parsed.
+    """
+    try:
+        html_data = get_stream_file(path, binary=True)
+        page = detect_page(html_data)
+        if page == "grades":
+            data = [semester.as_dict() for semester in Grade(html_data).all()]
+        elif page == "schedule":
+            sched = Schedule(html_data)
+            data = {
+                "semester": sched.semester,
+                "school_year": sched.school_year,
+                "schedule": [entry.as_dict() for entry in sched.get_schedule()],
+            }
+        else:
+            return {"path": path, "error": "ValueError: not a grades or schedule page"}
+        return {"path": path, "type": page, "data": data}
+    except Exception as e:
+        return {"path": path, "error": f"{type(e).__name__}: {e}"}
+
+
+def parse_chunk(paths: list) -> list:
+    return [parse_file(path) for path in paths]
+
+
+def iter_paths(targets: Iterable[str]) -> Iterator[str]:
+    """Expands directories (recursively) and glob patterns into the HTML files they contain."""
+    for target in targets:
+        if os.path.isdir(target):
+            for path in sorted(Path(target).rglob("*")):
+                if path.suffix.lower() in HTML_SUFFIXES and path.is_file():
+                    yield str(path)
+        elif glob.has_magic(target):
+            yield from sorted(glob.iglob(target, recursive=True))
+        else:
+            yield target
+
+
+def chunked(paths: Iterable[str], size: int) -> Iterator[list]:
+    chunk = []
+    for path in paths:
+        chunk.append(path)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def parse_files(targets: Iterable[str], workers: Optional[int] = None, chunksize: int = 16) -> Iterator[dict]:
+    """Parses saved grades and schedule pages across a process pool.
+
+    Files are sent to the workers in chunks, at most two chunks per worker are
+    in flight so memory stays bounded however many files there are. Results
+    are yielded in completion order, a file that fails gives an `error`
+    result instead of stopping the run.
+
+    Attributes:
+        targets (list): Files, directories or glob patterns.
+        workers (int): Number of processes, defaults to the CPU count, 1 parses in this process.
+        chunksize (int): Files per task.
+
+    Example:
+    >>> for result in parse_files(["saved/**/*.html"], workers=4):
+    ...     print(result["path"], result.get("error"))
+    """
+    chunks = chunked(iter_paths(targets), chunksize)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for chunk in chunks:
+            yield from parse_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for chunk in chunks:
+            pending.add(pool.submit(parse_chunk, chunk))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
@@ -0,0 +1,35 @@
+import argparse
+import json
+import sys
+
+from pupsis.bulk import parse_files
+
+
+def parse_command(args) -> int:
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    failed = 0
+    try:
+        for result in parse_files(args.targets, workers=args.workers, chunksize=args.chunksize):
+            if "error" in result:
+                failed += 1
+                print(f"{result['path']}: {result['error']}", file=sys.stderr)
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 1 if failed else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="pupsis", description="Unofficial Python API wrapper for PUPSIS")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parse = commands.add_parser("parse", help="parse saved grades and schedule pages into JSON Lines")
+    parse.add_argument("targets", nargs="+", help="HTML files, directories or glob patterns")
+    parse.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parse.add_argument("-c", "--chunksize", type=int, default=16, help="files per worker task (default: 16)")
+    parse.add_argument("-o", "--output", help="write the results to a file instead of stdout")
+    parse.set_defaults(handler=parse_command)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
@@ -53,6 +53,41 @@ class InvalidBirthdate(Exception):
         super().__init__(self.message)
 
 
+class ParseError(Exception):
+    """Exception raised when an SIS page does not have the expected structure."""
+
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(self.message)
+
+
+class RetriesExhausted(LoginError):
+    """Exception raised when a request failed on every attempt it was allowed.
+
+    Attributes:
+        attempts: The `Attempt`s made, with their mirror, wait and outcome.
+    """
+
+    def __init__(self, attempts: list):
+        self.attempts = attempts
+        super().__init__(f"Request failed after {len(attempts)} attempts on the SIS mirrors.")
+
+
+class DeadlineExceeded(TimeoutError):
+    """Exception raised when a call runs out of its overall time budget.
+
+    Attributes:
+        attempts: The `Attempt`s of the request that ran out of time, if any.
+    """
+
+    def __init__(self, seconds, step, attempts=None):
+        self.seconds = seconds
+        self.step = step
+        self.attempts = attempts or []
+        self.message = f"Deadline of {seconds}s exceeded while {step}."
+        super().__init__(self.message)
+
+
 # warning messages
 
 REQUEST_DELAY_ZERO = (
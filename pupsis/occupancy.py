@@ -0,0 +1,284 @@
+from typing import Hashable, Iterable, Optional, Union
+
+from pupsis.scrapers.schedule import MINUTES_PER_DAY, Meeting, Schedule, Timetable, to_day, to_minutes
+
+
+class Occupancy:
+    """Busy time of a week as a bitmap of fixed size slots.
+
+    Bit `day * slots_per_day + slot` is set when the slot is busy, the whole
+    week is one Python int, so the union or intersection of two weeks is a
+    single `|` or `&` over all their slots at once. A meeting covers every
+    slot it touches, a 7:30-9:00 meeting at 15 minute resolution fills the
+    7:30-9:00 slots, one at 7:40 also fills the 7:30 slot.
+
+    Attributes:
+        bits (int): The bitmap.
+        resolution (int): Minutes per slot, must divide a day.
+
+    Example:
+    >>> a = Occupancy.from_schedule(Schedule(html_a))
+    >>> b = Occupancy.from_schedule(Schedule(html_b))
+    >>> (a | b).free("W", "7:00AM", "5:00PM", min_length=60)
+    >>> (a & b).minutes
+    """
+
+    __slots__ = ("bits", "resolution")
+
+    def __init__(self, bits: int = 0, resolution: int = 5):
+        if MINUTES_PER_DAY % resolution:
+            raise ValueError(f"resolution must divide {MINUTES_PER_DAY} minutes, got {resolution}")
+        self.bits = bits
+        self.resolution = resolution
+
+    @property
+    def slots_per_day(self) -> int:
+        return MINUTES_PER_DAY // self.resolution
+
+    @classmethod
+    def from_meetings(cls, meetings: Iterable[Meeting], resolution: int = 5):
+        slots_per_day = MINUTES_PER_DAY // resolution
+        bits = 0
+        for meeting in meetings:
+            first = meeting.start // resolution
+            last = -(-meeting.end // resolution)
+            if last > first:
+                bits |= ((1 << (last - first)) - 1) << (meeting.day * slots_per_day + first)
+        return cls(bits, resolution)
+
+    @classmethod
+    def from_schedule(cls, schedule: Union[Schedule, Timetable], resolution: int = 5):
+        timetable = schedule.timetable if isinstance(schedule, Schedule) else schedule
+        return cls.from_meetings(timetable, resolution)
+
+    def _check(self, other: "Occupancy"):
+        if other.resolution != self.resolution:
+            raise ValueError(f"Cannot combine occupancies of {self.resolution} and {other.resolution} minute slots")
+
+    def __or__(self, other: "Occupancy"):
+        self._check(other)
+        return Occupancy(self.bits | other.bits, self.resolution)
+
+    def __and__(self, other: "Occupancy"):
+        self._check(other)
+        return Occupancy(self.bits & other.bits, self.resolution)
+
+    def __sub__(self, other: "Occupancy"):
+        self._check(other)
+        return Occupancy(self.bits & ~other.bits, self.resolution)
+
+    def __invert__(self):
+        week = (1 << (7 * self.slots_per_day)) - 1
+        return Occupancy(~self.bits & week, self.resolution)
+
+    def __eq__(self, other):
+        return isinstance(other, Occupancy) and (self.bits, self.resolution) == (other.bits, other.resolution)
+
+    def __hash__(self):
+        return hash((self.bits, self.resolution))
+
+    def __bool__(self):
+        return bool(self.bits)
+
+    @property
+    def minutes(self) -> int:
+        """Busy minutes in the week."""
+        return bin(self.bits).count("1") * self.resolution
+
+    def day(self, day: Union[int, str]) -> int:
+        """The bitmap of one day, bit `slot` is set when the slot is busy."""
+        return (self.bits >> (to_day(day) * self.slots_per_day)) & ((1 << self.slots_per_day) - 1)
+
+    def is_busy(self, day: Union[int, str], time: Union[int, str]) -> bool:
+        minute = to_minutes(time) if isinstance(time, str) else time
+        return bool(self.day(day) >> (minute // self.resolution) & 1)
+
+    def busy(self, day: Union[int, str]) -> list:
+        """The busy periods of a day, as `(start, end)` minutes since midnight."""
+        bits = self.day(day)
+        periods = []
+        while bits:
+            first = (bits & -bits).bit_length() - 1
+            length = ((bits >> first) + 1 & ~(bits >> first)).bit_length() - 1
+            periods.append((first * self.resolution, (first + length) * self.resolution))
+            bits &= ~(((1 << length) - 1) << first)
+        return periods
+
+    def free(
+        self,
+        day: Union[int, str],
+        start: Union[int, str] = 0,
+        end: Union[int, str] = MINUTES_PER_DAY,
+        min_length: int = 0,
+    ) -> list:
+        """The free periods of a day between two times, see `Timetable.free`."""
+        start = to_minutes(start) if isinstance(start, str) else start
+        end = to_minutes(end) if isinstance(end, str) else end
+        first, last = start // self.resolution, -(-end // self.resolution)
+        if last <= first:
+            return []
+        window = ((1 << (last - first)) - 1) << first
+        free = Occupancy(~self.day(day) & window, self.resolution)
+        return [
+            (max(slot_start, start), min(slot_end, end))
+            for slot_start, slot_end in free.busy(0)
+            if min(slot_end, end) - max(slot_start, start) >= max(min_length, 1)
+        ]
+
+    def __repr__(self):
+        return f"<Occupancy {self.minutes} busy minutes at {self.resolution} minute slots>"
+
+
+def _add(planes: list, bits: int):
+    """Adds a bitmap to bit-sliced counters, `planes[k]` holds bit k of every slot's count."""
+    for index, plane in enumerate(planes):
+        planes[index] = plane ^ bits
+        bits &= plane
+        if not bits:
+            return
+    planes.append(bits)
+
+
+class Cohort:
+    """Occupancy of many schedules, for common free time, headcounts and faculty load.
+
+    Each schedule is turned into an `Occupancy` once. Unions and
+    intersections over the cohort are one bitwise operation per member, and
+    headcounts are kept as bit-sliced counters, adding a member costs about
+    log2(members) bitwise operations over the whole week, whatever the size
+    of its schedule.
+
+    Attributes:
+        resolution (int): Minutes per slot.
+        members (dict): `Occupancy` by member key, e.g. the student number.
+        faculty (dict): `Occupancy` of the classes of each faculty member, a class
+            shared by many members counts once.
+
+    Example:
+    >>> cohort = Cohort(resolution=5)
+    >>> for student_number, html in pages.items():
+    ...     cohort.add(student_number, Schedule(html))
+    >>> cohort.common_free("Friday", "7:00AM", "9:00PM", min_length=60)
+    >>> cohort.headcount_at("M", "10:00AM")
+    >>> cohort.faculty_load()
+    """
+
+    def __init__(self, resolution: int = 5):
+        self.resolution = resolution
+        self.members = {}
+        self.faculty = {}
+        self._planes = []
+        self._union = 0
+        self._member_faculty = {}
+
+    def add(self, key: Hashable, schedule: Union[Schedule, Timetable]):
+        """Adds the schedule of a member, replacing the one it had."""
+        timetable = schedule.timetable if isinstance(schedule, Schedule) else schedule
+        occupancy = Occupancy.from_meetings(timetable, self.resolution)
+
+        by_faculty = {}
+        for meeting in timetable:
+            name = meeting.entry.faculty_name if meeting.entry is not None else None
+            if name:
+                by_faculty.setdefault(name, []).append(meeting)
+        loads = {name: Occupancy.from_meetings(meetings, self.resolution) for name, meetings in by_faculty.items()}
+
+        replaced = key in self.members
+        self.members[key] = occupancy
+        self._member_faculty[key] = loads
+        if replaced:
+            self._rebuild()
+            return
+        _add(self._planes, occupancy.bits)
+        self._union |= occupancy.bits
+        for name, load in loads.items():
+            self.faculty[name] = self.faculty[name] | load if name in self.faculty else load
+
+    def remove(self, key: Hashable):
+        """Removes a member, with the faculty load of its classes."""
+        self.members.pop(key)
+        self._member_faculty.pop(key)
+        self._rebuild()
+
+    def _rebuild(self):
+        self._planes, self._union, self.faculty = [], 0, {}
+        for occupancy in self.members.values():
+            _add(self._planes, occupancy.bits)
+            self._union |= occupancy.bits
+        for loads in self._member_faculty.values():
+            for name, load in loads.items():
+                self.faculty[name] = self.faculty[name] | load if name in self.faculty else load
+
+    def __len__(self):
+        return len(self.members)
+
+    def union(self, keys: Optional[Iterable[Hashable]] = None) -> Occupancy:
+        """Slots where at least one of the members (all by default) is busy."""
+        if keys is None:
+            return Occupancy(self._union, self.resolution)
+        bits = 0
+        for key in keys:
+            bits |= self.members[key].bits
+        return Occupancy(bits, self.resolution)
+
+    def intersection(self, keys: Optional[Iterable[Hashable]] = None) -> Occupancy:
+        """Slots where every one of the members (all by default) is busy."""
+        occupancies = [self.members[key] for key in (self.members if keys is None else keys)]
+        if not occupancies:
+            return Occupancy(0, self.resolution)
+        bits = occupancies[0].bits
+        for occupancy in occupancies[1:]:
+            bits &= occupancy.bits
+        return Occupancy(bits, self.resolution)
+
+    def common_free(
+        self,
+        day: Union[int, str],
+        start: Union[int, str] = 0,
+        end: Union[int, str] = MINUTES_PER_DAY,
+        min_length: int = 0,
+        keys: Optional[Iterable[Hashable]] = None,
+    ) -> list:
+        """Periods of a day when all the members (all by default) are free."""
+        return self.union(keys).free(day, start, end, min_length)
+
+    def headcount(self) -> list:
+        """Busy members per slot of the week, `7 * slots_per_day` counts starting Monday midnight."""
+        size = 7 * (MINUTES_PER_DAY // self.resolution)
+        counts = [0] * size
+        for weight, plane in enumerate(self._planes):
+            # the reversed binary string lists the bits slot by slot
+            for slot, bit in enumerate(bin(plane)[:1:-1]):
+                if bit == "1":
+                    counts[slot] += 1 << weight
+        return counts
+
+    def headcount_at(self, day: Union[int, str], time: Union[int, str]) -> int:
+        """Members busy at a time."""
+        minute = to_minutes(time) if isinstance(time, str) else time
+        slot = to_day(day) * (MINUTES_PER_DAY // self.resolution) + minute // self.resolution
+        return sum((plane >> slot & 1) << weight for weight, plane in enumerate(self._planes))
+
+    def at_least(self, count: int) -> Occupancy:
+        """Slots where at least `count` members are busy, e.g. to find the peaks of a cohort."""
+        if count <= 0:
+            return ~Occupancy(0, self.resolution)
+        # compares the bit-sliced counts with `count` from the highest bit down
+        greater, equal = 0, ~0
+        for weight in range(max(len(self._planes), count.bit_length()) - 1, -1, -1):
+            plane = self._planes[weight] if weight < len(self._planes) else 0
+            if count >> weight & 1:
+                equal &= plane
+            else:
+                greater |= equal & plane
+                equal &= ~plane
+        week = (1 << (7 * (MINUTES_PER_DAY // self.resolution))) - 1
+        return Occupancy((greater | equal) & week, self.resolution)
+
+    def faculty_load(self) -> dict:
+        """Minutes per week each faculty member teaches, busiest first."""
+        loads = {name: occupancy.minutes for name, occupancy in self.faculty.items()}
+        return dict(sorted(loads.items(), key=lambda item: item[1], reverse=True))
+
+    def __repr__(self):
+        return f"<Cohort of {len(self.members)} schedules at {self.resolution} minute slots>"
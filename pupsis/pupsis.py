@@ -1,13 +1,31 @@
-from typing import Optional
-from pupsis.api import APIRequester
+from typing import TYPE_CHECKING, Optional, Union
+import asyncio
+
+from pupsis.utils.deadline import Deadline
+from pupsis.session import SessionManager, SessionStore
+from pupsis.utils.parsecache import ParseCache
+from pupsis.utils.metrics import Metrics, shared_metrics
 from pupsis.scrapers import grades, schedule
+from pupsis.scrapers.changes import GradeTracker
 from pupsis.utils.logs import Logger
-from pupsis.utils import get_stream_file
+from pupsis.utils import get_stream_file, LazyImport
 from pupsis.utils.types import *
 from pupsis.errors import *
 
+if TYPE_CHECKING:
+    # the HTTP stack is only imported when a requester is built
+    import httpx
+    from pupsis.utils.pacer import RequestPacer
+    from pupsis.utils.mirrors import MirrorPool
+    from pupsis.utils.httpcache import CacheConfig
+    from pupsis.utils.pool import ConnectionPool
+    from pupsis.utils.limiter import AdaptiveLimiter
+    from pupsis.utils.retry import RetryPolicy
+
 
 class PUPSIS:
+    requester_class = LazyImport("pupsis.api", "APIRequester")
+
     def __init__(
         self,
         student_number: Optional[str] = None,
@@ -22,6 +40,18 @@ class PUPSIS:
         logfile: Optional[str] = None,
         loglevel: Optional[str] = None,
         request_delay: Optional[int] = 2,
+        session_store: Optional[Union[str, SessionStore]] = None,
+        pacer: Optional["RequestPacer"] = None,
+        mirrors: Optional["MirrorPool"] = None,
+        connect_timeout: Optional[float] = 10.0,
+        read_timeout: Optional[float] = 100.0,
+        parse_cache: Optional[ParseCache] = None,
+        cache: Optional["CacheConfig"] = None,
+        transport: Optional[Union["httpx.BaseTransport", "httpx.AsyncBaseTransport"]] = None,
+        metrics: Optional[Metrics] = None,
+        pool: Optional["ConnectionPool"] = None,
+        limiter: Optional["AdaptiveLimiter"] = None,
+        retry: Optional["RetryPolicy"] = None,
     ):
         """
         Class used for instatiating a PUPSIS object.
@@ -33,7 +63,26 @@ class PUPSIS:
             headers (dict): The headers to be used in the request.
             logfile (str): The path to the log file.
             loglevel (str): The logging level.
-            request_delay (int): The delay between requests.
+            request_delay (int): Only turns request pacing on or off, 0 or less disables it. The
+                rate comes from the pacer, see `pacer` and `RequestPacer.configure`.
+            session_store (str | SessionStore): Directory to save the login cookies in,
+                so a restarted process resumes the session instead of logging in again.
+            pacer (RequestPacer): The request budget to use, defaults to the one shared by the process.
+            mirrors (MirrorPool): The SIS mirrors and their health, defaults to the pool shared by the process.
+            connect_timeout (float): Seconds allowed to connect to a mirror, per attempt.
+            read_timeout (float): Seconds allowed to read a response, per attempt.
+            parse_cache (ParseCache): Skip parsing pages that were already parsed.
+            cache (CacheConfig): HTTP cache backend, per-endpoint TTLs and size cap,
+                defaults to the file cache shared by the process.
+            transport (httpx.BaseTransport): Network layer of the requester, e.g. an `httpx.MockTransport`
+                to run against a local stand-in of SIS. `AsyncPUPSIS` takes an `httpx.AsyncBaseTransport`.
+            metrics (Metrics): Where request, login and parse timings are recorded,
+                defaults to the metrics shared by the process.
+            pool (ConnectionPool): Keep-alive connections to the mirrors, defaults to the pool
+                shared by the process. Unused when `transport` is given.
+            limiter (AdaptiveLimiter): Adapts the requests in flight per mirror to how SIS answers,
+                defaults to the limiter shared by the process.
+            retry (RetryPolicy): Attempts, backoff and `Retry-After` handling of failed requests.
 
         Example:
         >>> student = PUPSIS(student_number="2020-12345-MN-0", student_birthdate="1/02/2003", password="mypassword")
@@ -50,6 +99,17 @@ class PUPSIS:
         self.loglevel = loglevel
         self.logger = Logger("pupSIS", log_file=self.logfile, level=self.loglevel)
         self.request_delay = request_delay
+        self.pacer = pacer
+        self.mirrors = mirrors
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.parse_cache = parse_cache
+        self.cache = cache
+        self.transport = transport
+        self.metrics = metrics or shared_metrics
+        self.pool = pool
+        self.limiter = limiter
+        self.retry = retry
 
         if self.request_delay <= 0:
             self.logger.warning(REQUEST_DELAY_ZERO)
@@ -63,6 +123,11 @@ class PUPSIS:
         if not any([self.student_number, self.student_birthdate, self.password]):
             self.logger.info("PUPSIS instance created without credentials.")
 
+        if isinstance(session_store, str):
+            session_store = SessionStore(session_store)
+        self.session = SessionManager(self.student_number, store=session_store)
+        self.grade_tracker = GradeTracker()
+
     @staticmethod
     def set_student_number(student_number: str):
         try:
@@ -77,7 +142,64 @@ class PUPSIS:
         except ValueError:
             raise InvalidBirthdate(student_birthdate)
 
-    def grades(self, grades_filename: Optional[str] = None):
+    def _requester(self, action: str):
+        """Returns the requester of the current session, building one from the instance credentials.
+
+        Raises:
+            ValueError: If the required credentials are missing.
+        """
+        missing_fields = [
+            field
+            for field, value in {
+                "student_number": self.student_number,
+                "student_birthdate": self.student_birthdate,
+                "password": self.password,
+            }.items()
+            if not value
+        ]
+
+        if missing_fields:
+            raise ValueError(
+                f"Missing required credentials for fetching {action}: {', '.join(missing_fields)}"
+            )
+
+        return self.session.requester(lambda: self.requester_class(**self._requester_options()))
+
+    def _requester_options(self):
+        """Keyword arguments used to build the requester of the session."""
+        return dict(
+            student_number=self.student_number,
+            student_birthdate=self.student_birthdate,
+            password=self.password,
+            logfile=self.logfile,
+            loglevel=self.loglevel,
+            headers=self.headers,
+            request_delay=self.request_delay,
+            pacer=self.pacer,
+            mirrors=self.mirrors,
+            connect_timeout=self.connect_timeout,
+            read_timeout=self.read_timeout,
+            cache=self.cache,
+            transport=self.transport,
+            metrics=self.metrics,
+            pool=self.pool,
+            limiter=self.limiter,
+            retry=self.retry,
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Closes the HTTP client of the current session, the pooled connections stay open."""
+        if self.session.api is not None:
+            self.session.api.close()
+            self.session.api = None
+
+    def grades(self, grades_filename: Optional[str] = None, deadline: Optional[float] = None):
         """
         Fetches the student grades from the PUPSIS portal
 
@@ -85,6 +207,7 @@ class PUPSIS:
 
         Attributes:
             grades_filename (str): The path to the grades file. 
+            deadline (float): Overall seconds allowed for logging in and fetching the page.
 
         Returns:
             Grade: An instance of the `Grade` class containing the parsed grades data.
@@ -100,39 +223,56 @@ class PUPSIS:
             SurveyError: If the user has not completed the survey.
             LoginError: If the login credentials are incorrect.
             MultipleLoginAttempt: If the user has exceeded the maximum login attempts.clear
+            DeadlineExceeded: If the deadline runs out.
             ValueError: If the required credentials are missing. (if filepath is not provided)
         """
+        return self._parse_grades(self._grades_html(grades_filename, deadline))
+
+    def _parse_grades(self, html):
+        with self.metrics.timer("pupsis_parse_duration_seconds", page="grades"):
+            return grades.Grade(html, parse_cache=self.parse_cache)
+
+    def _parse_schedule(self, html):
+        with self.metrics.timer("pupsis_parse_duration_seconds", page="schedule"):
+            result = schedule.Schedule(html, parse_cache=self.parse_cache)
+            # the schedule is parsed on first access
+            result.body
+            return result
+
+    def _grades_html(self, grades_filename: Optional[str] = None, deadline: Optional[float] = None):
         if grades_filename:
-            self.logger.info(f"Fetching grades from file: {grades_filename}")
-            return grades.Grade(get_stream_file(grades_filename))
+            self.logger.info("Fetching grades from file: %s", grades_filename)
+            return get_stream_file(grades_filename, binary=True)
 
-        missing_fields = [
-            field
-            for field, value in {
-                "student_number": self.student_number,
-                "student_birthdate": self.student_birthdate,
-                "password": self.password,
-            }.items()
-            if not value
-        ]
+        api = self._requester("grades")
+        html = api.get_grades(deadline=deadline, as_bytes=True)
+        self.session.save()
+        return html
 
-        if missing_fields:
-            raise ValueError(
-                f"Missing required credentials for fetching grades: {', '.join(missing_fields)}"
-            )
+    def grade_changes(self, grades_filename: Optional[str] = None, deadline: Optional[float] = None):
+        """
+        Fetches the grades and reports what changed since the previous call.
 
-        api = APIRequester(
-            student_number=self.student_number,
-            student_birthdate=self.student_birthdate,
-            password=self.password,
-            logfile=self.logfile,
-            loglevel=self.loglevel,
-            headers=self.headers,
-            request_delay=self.request_delay,
-        )
-        return grades.Grade(api.get_grades())
+        Only the semesters whose part of the page changed are parsed again.
+        The first call reports every semester as new.
+
+        Attributes:
+            grades_filename (str): The path to the grades file.
+            deadline (float): Overall seconds allowed for logging in and fetching the page.
+
+        Returns:
+            GradeDiff: The new semesters, the entries whose `Final_Grade` or `Grade_Status`
+                changed, and the full `Grade` of the page.
+
+        Example:
+        >>> student.grade_changes()
+        >>> diff = student.grade_changes()
+        >>> for change in diff.changes:
+        ...     print(change.entry.Subject_Code, change.entry.Final_Grade)
+        """
+        return self.grade_tracker.update(self._grades_html(grades_filename, deadline))
 
-    def schedule(self, schedule_filename: Optional[str] = None):
+    def schedule(self, schedule_filename: Optional[str] = None, deadline: Optional[float] = None):
         """
         Fetches the student schedule from the PUPSIS portal
 
@@ -141,6 +281,7 @@ class PUPSIS:
 
         Attributes:
             schedule_filename (str): The path to the schedule file.
+            deadline (float): Overall seconds allowed for logging in and fetching the page.
 
         Returns:
             Schedule: An instance of the `Schedule` class containing the parsed schedule data.
@@ -154,35 +295,139 @@ class PUPSIS:
             SurveyError: If the user has not completed the survey.
             LoginError: If the login credentials are incorrect.
             MultipleLoginAttempt: If the user has exceeded the maximum login attempts.
+            DeadlineExceeded: If the deadline runs out.
             ValueError: If the required credentials are missing. (if filepath is not provided)
 
         """
         if schedule_filename:
-            self.logger.info(f"Fetching schedule from file: {schedule_filename}")
-            return schedule.Schedule(get_stream_file(schedule_filename))
+            self.logger.info("Fetching schedule from file: %s", schedule_filename)
+            return self._parse_schedule(get_stream_file(schedule_filename, binary=True))
 
-        missing_fields = [
-            field
-            for field, value in {
-                "student_number": self.student_number,
-                "student_birthdate": self.student_birthdate,
-                "password": self.password,
-            }.items()
-            if not value
-        ]
+        api = self._requester("schedule")
+        html = api.get_schedule(deadline=deadline, as_bytes=True)
+        self.session.save()
+        return self._parse_schedule(html)
 
-        if missing_fields:
-            raise ValueError(
-                f"Missing required credentials for fetching schedule: {', '.join(missing_fields)}"
-            )
 
-        api = APIRequester(
-            student_number=self.student_number,
-            student_birthdate=self.student_birthdate,
-            password=self.password,
-            logfile=self.logfile,
-            loglevel=self.loglevel,
-            headers=self.headers,
-            request_delay=self.request_delay,
+
+class AsyncPUPSIS(PUPSIS):
+    """Asyncio counterpart of `PUPSIS`, built on `AsyncAPIRequester`.
+
+    Takes the same arguments as `PUPSIS`. Fetches of many students can be
+    awaited on one event loop.
+
+    Attributes:
+        hedge_percentile (float): Hedge slow requests made outside of a session
+            to a second mirror, see `AsyncAPIRequester`.
+
+    Example:
+    >>> student = AsyncPUPSIS(student_number="2020-12345-MN-0", student_birthdate="1/02/2003", password="mypassword")
+    >>> grades, sched = await student.fetch_all()
+    >>> await student.aclose()
+    """
+
+    requester_class = LazyImport("pupsis.api", "AsyncAPIRequester")
+
+    def __init__(self, *args, hedge_percentile: Optional[float] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hedge_percentile = hedge_percentile
+
+    def _requester_options(self):
+        return dict(super()._requester_options(), hedge_percentile=self.hedge_percentile)
+
+    def __enter__(self):
+        raise TypeError("AsyncPUPSIS has an async client, use `async with AsyncPUPSIS(...)` instead of `with`.")
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def close(self):
+        raise TypeError("AsyncPUPSIS has an async client, close it with `await student.aclose()`.")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """Closes the HTTP client of the current session."""
+        if self.session.api is not None:
+            await self.session.api.aclose()
+            self.session.api = None
+
+    async def grades(self, grades_filename: Optional[str] = None, deadline: Optional[float] = None):
+        """
+        Fetches the student grades from the PUPSIS portal, see `PUPSIS.grades`.
+
+        Returns:
+            Grade: An instance of the `Grade` class containing the parsed grades data.
+        """
+        return self._parse_grades(await self._grades_html(grades_filename, deadline))
+
+    async def _grades_html(self, grades_filename: Optional[str] = None, deadline: Optional[float] = None):
+        if grades_filename:
+            return super()._grades_html(grades_filename)
+
+        api = self._requester("grades")
+        html = await api.get_grades(deadline=deadline, as_bytes=True)
+        self.session.save()
+        return html
+
+    async def grade_changes(self, grades_filename: Optional[str] = None, deadline: Optional[float] = None):
+        """
+        Fetches the grades and reports what changed since the previous call, see `PUPSIS.grade_changes`.
+
+        Returns:
+            GradeDiff: The new semesters, changed entries and the full `Grade` of the page.
+        """
+        return self.grade_tracker.update(await self._grades_html(grades_filename, deadline))
+
+    async def schedule(self, schedule_filename: Optional[str] = None, deadline: Optional[float] = None):
+        """
+        Fetches the student schedule from the PUPSIS portal, see `PUPSIS.schedule`.
+
+        Returns:
+            Schedule: An instance of the `Schedule` class containing the parsed schedule data.
+        """
+        if schedule_filename:
+            return super().schedule(schedule_filename=schedule_filename)
+
+        api = self._requester("schedule")
+        html = await api.get_schedule(deadline=deadline, as_bytes=True)
+        self.session.save()
+        return self._parse_schedule(html)
+
+    async def fetch_all(self, deadline: Optional[float] = None):
+        """
+        Logs in once and fetches the grades and schedule pages at the same time.
+
+        Attributes:
+            deadline (float): Overall seconds allowed for logging in and fetching both pages.
+
+        Returns:
+            tuple: A `(Grade, Schedule)` pair.
+
+        Example:
+        >>> grades, sched = await student.fetch_all()
+        >>> print(grades.latest())
+
+        Raises:
+            LoginError: If the login credentials are incorrect.
+            MultipleLoginAttempt: If the user has exceeded the maximum login attempts.
+            DeadlineExceeded: If the deadline runs out.
+            ValueError: If the required credentials are missing.
+        """
+        api = self._requester("grades and schedule")
+        budget = Deadline(deadline, connect=api.connect_timeout, read=api.read_timeout)
+        budget.plan(1)  # both pages are fetched in one step
+        await api.login(budget)
+        grades_html, schedule_html = await asyncio.gather(
+            api.fetch_page("grades", budget, as_bytes=True),
+            api.fetch_page("schedule", budget, as_bytes=True),
+        )
+        self.session.save()
+        return (
+            self._parse_grades(grades_html),
+            self._parse_schedule(schedule_html),
         )
-        return schedule.Schedule(api.get_schedule())
@@ -0,0 +1,127 @@
+from hashlib import blake2b
+from selectolax.lexbor import LexborHTMLParser
+from pupsis.scrapers.grades import Grade, GradesWrapper, parse_card
+from pupsis.utils import html_source
+
+
+class GradeChange:
+    """A grade entry whose `Final_Grade` or `Grade_Status` changed between two polls.
+
+    Attributes:
+        semester (GradesWrapper): The semester of the entry.
+        entry (GradeEntry): The entry as it is now.
+        old_final_grade: The previous `Final_Grade`, None for a new entry.
+        old_grade_status (str): The previous `Grade_Status`, None for a new entry.
+    """
+
+    __slots__ = ("semester", "entry", "old_final_grade", "old_grade_status")
+
+    def __init__(self, semester, entry, old_final_grade=None, old_grade_status=None):
+        self.semester = semester
+        self.entry = entry
+        self.old_final_grade = old_final_grade
+        self.old_grade_status = old_grade_status
+
+    def __repr__(self):
+        return (
+            f"<{self.entry.Subject_Code} {self.old_final_grade} -> {self.entry.Final_Grade} "
+            f"({self.old_grade_status} -> {self.entry.Grade_Status})>"
+        )
+
+
+class GradeDiff:
+    """What changed on the grades page since the previous poll.
+
+    Attributes:
+        grade (Grade): The full grades of the current page.
+        new_semesters (list): Semesters that were not on the previous page.
+        changes (list): `GradeChange` of every new or updated entry of a known semester.
+        reparsed (int): Number of semester cards that had to be parsed.
+    """
+
+    def __init__(self, grade: Grade, new_semesters: list, changes: list, reparsed: int):
+        self.grade = grade
+        self.new_semesters = new_semesters
+        self.changes = changes
+        self.reparsed = reparsed
+
+    def __bool__(self):
+        return bool(self.new_semesters or self.changes)
+
+    def __repr__(self):
+        return f"<GradeDiff new_semesters={self.new_semesters} changes={self.changes}>"
+
+
+class GradeTracker:
+    """Polls the grades page incrementally.
+
+    Each `div.card-theme` semester card is fingerprinted, only cards whose
+    fingerprint changed since the previous snapshot are parsed again, an
+    unchanged semester costs only a hash.
+
+    Example:
+    >>> tracker = GradeTracker()
+    >>> tracker.update(html)         # first poll, every semester is new
+    >>> diff = tracker.update(html)  # later polls
+    >>> for change in diff.changes:
+    ...     print(change.entry.Subject_Code, change.old_final_grade, change.entry.Final_Grade)
+    """
+
+    def __init__(self):
+        self.cards = {}      # fingerprint -> (header, infos, rows)
+        self.semesters = {}  # (Academic_Year, Semester) -> GradesWrapper
+
+    def update(self, html_data: str) -> GradeDiff:
+        """Compares a grades page with the previous snapshot and makes it the new one.
+
+        Returns:
+            GradeDiff: The new semesters and changed entries.
+
+        Raises:
+            ParseError: If a changed semester card has no school year and semester header.
+        """
+        html_data = html_source(html_data)
+        tree = LexborHTMLParser(html_data)
+        cards = {}
+        records = []
+        fingerprints = []
+        reparsed = 0
+        for index, card in enumerate(tree.css("div.card-theme")):
+            fingerprint = blake2b(card.html.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+            record = cards.get(fingerprint) or self.cards.get(fingerprint)
+            if record is None:
+                record = parse_card(card, index)
+                reparsed += 1
+            cards[fingerprint] = record
+            records.append(record)
+            fingerprints.append(fingerprint)
+
+        headers, infos, rows = (list(column) for column in zip(*records)) if records else ([], [], [])
+        grade = Grade.from_records(html_data, headers, infos, rows)
+
+        new_semesters, changes = [], []
+        semesters = {}
+        for fingerprint, semester in zip(fingerprints, grade.all()):
+            key = (semester.Academic_Year, semester.Semester)
+            semesters[key] = semester
+            previous = self.semesters.get(key)
+            if previous is None:
+                new_semesters.append(semester)
+            elif fingerprint not in self.cards:
+                changes.extend(self._compare(previous, semester))
+
+        self.cards = cards
+        self.semesters = semesters
+        return GradeDiff(grade, new_semesters, changes, reparsed)
+
+    @staticmethod
+    def _compare(previous: GradesWrapper, semester: GradesWrapper) -> list:
+        old_entries = {entry.Subject_Code: entry for entry in previous.grades}
+        changes = []
+        for entry in semester.grades:
+            old = old_entries.get(entry.Subject_Code)
+            if old is None:
+                changes.append(GradeChange(semester, entry))
+            elif (old.Final_Grade, old.Grade_Status) != (entry.Final_Grade, entry.Grade_Status):
+                changes.append(GradeChange(semester, entry, old.Final_Grade, old.Grade_Status))
+        return changes
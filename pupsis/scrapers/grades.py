@@ -1,28 +1,130 @@
 from selectolax.lexbor import LexborHTMLParser
+from functools import cached_property
 from pupsis.utils.logs import Logger
+from pupsis.errors import ParseError
+from pupsis.utils import html_source
 import re
 
 
+HEADER_PATTERN = re.compile(r"School Year (\d{4}).*?(First|Second|Summer)")
+
+# NSTP (CWTS, ROTC) and PATHFIT subjects, left out of the GPA
+EXCLUDED_SUBJECTS = ("CWTS", "ROTC", "NSTP", "PATHFIT")
+
+
+def is_excluded(subject_code: str) -> bool:
+    """Checks if a subject is an NSTP or PATHFIT subject, which does not count towards the GPA."""
+    return subject_code.startswith(EXCLUDED_SUBJECTS)
+
+
+def parse_card(card, index: int = 0):
+    """Extracts one semester card of the grades page.
+
+    Attributes:
+        card (LexborNode): A `div.card-theme` node.
+        index (int): Position of the card on the page, used in errors.
+
+    Returns:
+        tuple: `(header, infos, rows)` of the semester.
+
+    Raises:
+        ParseError: If the card has no school year and semester header.
+    """
+    card_header = card.css_first("div.card-header")
+    match = HEADER_PATTERN.search(card_header.text(strip=True)) if card_header else None
+    if match is None:
+        raise ParseError(f"Semester card {index + 1} has no school year and semester header")
+    header = {"Academic_Year": match.group(1), "Semester": match.group(2)}
+
+    keys = [dt.text().replace(" ", "_") for dt in card.css("dt")]
+    values = [dd.text() for dd in card.css("dd")]
+    infos = dict(zip(keys, values))
+
+    columns = []
+    rows = []
+    for tr in card.css("thead tr, tbody tr"):
+        cells = [cell.text() for cell in tr.iter()]
+        if tr.parent.tag == "thead":
+            columns = [cell.replace(" ", "_") for cell in cells]
+        else:
+            rows.append(dict(zip(columns, [cell if cell.strip() else None for cell in cells])))
+    return header, infos, rows
+
+
+def to_number(value):
+    """Converts a numeric grade or units string to float, other values are returned as is."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+
 class GradeEntry:
-    """Wraps a grade entry dictionary into an object with attribute access."""
+    """Wraps a grade entry dictionary into an object with attribute access.
+
+    The usual columns are stored in slots, `Units` and `Final_Grade` are
+    converted to float when numeric (grades like "P" or "INC" stay strings).
+    Any other column of the page is kept in `extra` and is still readable as
+    an attribute.
+    """
+
+    __slots__ = ("Subject_Code", "Description", "Faculty_Name", "Units", "Final_Grade", "Grade_Status", "extra")
+
+    def __init__(self, Subject_Code=None, Description=None, Faculty_Name=None, Units=None,
+                 Final_Grade=None, Grade_Status=None, **extra):
+        self.Subject_Code = Subject_Code
+        self.Description = Description
+        self.Faculty_Name = Faculty_Name
+        self.Units = to_number(Units)
+        self.Final_Grade = to_number(Final_Grade)
+        self.Grade_Status = Grade_Status
+        self.extra = extra
 
-    def __init__(self, **kwargs):
-        self.__dict__.update(kwargs)
+    def __getattr__(self, name):
+        try:
+            return object.__getattribute__(self, "extra")[name]
+        except KeyError:
+            raise AttributeError(f"'GradeEntry' object has no attribute '{name}'") from None
+
+    def as_dict(self):
+        """Returns the entry as a dictionary of its columns."""
+        return {**self.extra, **{key: getattr(self, key) for key in self.__slots__[:-1]}}
 
     def __repr__(self):
         return f"<{self.Subject_Code}>"
 
 
 class GradesWrapper:
-    """Wraps the dictionary into attributes, including grades as objects."""
+    """Wraps the dictionary into attributes, including grades as objects.
 
-    def __init__(self, **kwargs):
-        for key, value in kwargs.items():
-            if key == "grades" and isinstance(value, list):
-                # Convert each dict to GradeEntry
-                self.grades = [GradeEntry(**grade) for grade in value]
-            else:
-                setattr(self, key, value)
+    The school year, semester and grades are stored in slots, the other
+    semester infos are kept in `extra` and are still readable as attributes.
+    """
+
+    __slots__ = ("Academic_Year", "Semester", "grades", "extra", "_complete")
+
+    def __init__(self, Academic_Year=None, Semester=None, grades=None, **extra):
+        self.Academic_Year = Academic_Year
+        self.Semester = Semester
+        # Convert each dict to GradeEntry
+        self.grades = [GradeEntry(**grade) if isinstance(grade, dict) else grade for grade in grades or []]
+        self.extra = extra
+        self._complete = {}
+
+    def __getattr__(self, name):
+        try:
+            return object.__getattribute__(self, "extra")[name]
+        except KeyError:
+            raise AttributeError(f"'GradesWrapper' object has no attribute '{name}'") from None
+
+    def as_dict(self):
+        """Returns the semester as a dictionary, grades included."""
+        return {
+            "Academic_Year": self.Academic_Year,
+            "Semester": self.Semester,
+            **self.extra,
+            "grades": [entry.as_dict() for entry in self.grades],
+        }
 
     @property
     def total_units(self):
@@ -31,7 +133,7 @@ class GradesWrapper:
         Returns:
             int: The total units of the semester grades.
         """
-        return sum([int(float(i.Units)) for i in self.grades])
+        return sum([int(i.Units) for i in self.grades])
 
     def is_complete(self, consider_p_grades=False):
         """Checks if the final grades are complete.
@@ -42,6 +144,11 @@ class GradesWrapper:
         Returns:
             bool: True if the grades are complete, False otherwise.
         """
+        if consider_p_grades not in self._complete:
+            self._complete[consider_p_grades] = self._is_complete(consider_p_grades)
+        return self._complete[consider_p_grades]
+
+    def _is_complete(self, consider_p_grades):
         for i in self.grades:
             if consider_p_grades:
                 if i.Final_Grade is None:
@@ -55,7 +162,7 @@ class GradesWrapper:
         """Calculates the GPA of the semester grades.
 
         Attributes:
-            exclude_nstp_and_nonnumeric (bool): Whether to exclude NSTP and non-numeric grades.
+            exclude_nstp_and_nonnumeric (bool): Whether to exclude NSTP, PATHFIT and non-numeric grades.
             round_off (int): Determines how the GPA should be rounded.
                             0 = No rounding (full precision),
                             1 = Round to 2 decimal places,
@@ -63,35 +170,24 @@ class GradesWrapper:
         Returns:
             float: The GPA of the semester grades.
         """
-        EXCLUDE_SUBJECTS = ["CWTS", "ROTC", "PATHFIT"]
-
         # Filter the subjects properly
-        filtered_grades = []
-
-        for i in self.grades:
-            if exclude_nstp_and_nonnumeric:
-                if not (i.Subject_Code.startswith(tuple(EXCLUDE_SUBJECTS))):
-                    filtered_grades.append(i)
-            else:
-                if i.Final_Grade is not None:
-                    filtered_grades.append(i)
+        if exclude_nstp_and_nonnumeric:
+            filtered_grades = [
+                i for i in self.grades if isinstance(i.Final_Grade, float) and not is_excluded(i.Subject_Code or "")
+            ]
+        else:
+            filtered_grades = [i for i in self.grades if i.Final_Grade is not None]
 
         # Step 2: Compute total grade points and total units
-        total_grade_points = sum(
-            float(i.Final_Grade) * float(i.Units) for i in filtered_grades
-        )
-        total_units = sum(float(i.Units) for i in filtered_grades)
-
-        # Debugging output
-        print(
-            f"Filtered Total Units: {total_units}, Total Grade Points: {total_grade_points}"
-        )
+        total_grade_points = sum(float(i.Final_Grade) * i.Units for i in filtered_grades)
+        total_units = sum(i.Units for i in filtered_grades)
 
         gpa = total_grade_points / total_units if total_units > 0 else 0
         if round_off == 0:
             return gpa  
         else:
             return round(gpa, round_off+1) 
+
     def __repr__(self):
         return f"<{self.Semester} term {self.Academic_Year}>"
 
@@ -100,7 +196,8 @@ class Grade:
     """Parses the HTML data from the pupSIS grades page.
 
     Attributes:
-        html_data (str): The HTML data as a string.
+        html_data (str | bytes): The HTML data, bytes, memoryview and mmap input is parsed without decoding.
+        parse_cache (ParseCache): Reuse the parsed result of a page seen before.
 
     Returns:
         latest(): Returns the latest semester grades.
@@ -108,73 +205,54 @@ class Grade:
 
     """
 
-    def __init__(self, html_data: str):
-        self.html_data = html_data
+    def __init__(self, html_data: str, parse_cache=None):
+        self.html_data = html_data = html_source(html_data)
 
         # Utilities
         self.grades = []
         self.infos = []
         self.header = []
+        if parse_cache is None:
+            self.parse
+        else:
+            self.header, self.infos, self.grades = parse_cache.fetch("grades", html_data, self.record)
+
+    @classmethod
+    def from_records(cls, html_data: str, header: list, infos: list, grades: list):
+        """Builds a `Grade` from already extracted lists, without parsing the page."""
+        self = cls.__new__(cls)
+        self.html_data = html_data
+        self.header, self.infos, self.grades = header, infos, grades
+        return self
+
+    def record(self):
+        """Parses the page and returns `[header, infos, grades]`, the form kept by `ParseCache`."""
         self.parse
+        return [self.header, self.infos, self.grades]
 
     @property
     def parse(self):
         """Extracts data from the HTML string and stores it in lists.
 
+        Each semester card is read in one pass with a fixed set of selectors,
+        the header, infos and grades of a card are always stored at the same
+        index.
+
         Attributes:
             grades (list): Parsed grades data.
             infos (list): Parsed info data.
             header (list): Parsed header data.
+
+        Raises:
+            ParseError: If a semester card has no school year and semester header.
         """
+        self.grades, self.infos, self.header = [], [], []
         tree = LexborHTMLParser(self.html_data)
-        user_grades = tree.css("div.card-theme")
-        for main in user_grades:
-            for secondary in main.iter():
-                temp_infos = {}
-                temp_grades = []
-                if secondary.attrs["class"] == "card-body":
-                    for index, divs in enumerate(secondary.iter()):
-                        if divs.css("dt") and divs.css("dd"):
-                            head = [
-                                (x.text()).replace(" ", "_") for x in divs.css("dt")
-                            ]
-                            tail = [x.text() for x in divs.css("dd")]
-                            temp_infos.update(dict(zip(head, tail)))
-                        else:
-                            for table in divs.css("table"):
-                                for x in table.iter():
-                                    if x.tag == "thead":
-                                        for j in x.iter():
-                                            t_head = [
-                                                (k.text().replace(" ", "_"))
-                                                for k in j.iter()
-                                            ]
-                                    if x.tag == "tbody":
-                                        for j in x.iter():
-                                            t_rows = [
-                                                (
-                                                    k.text()
-                                                    if k.text(strip=True) != ""
-                                                    else None
-                                                )
-                                                for k in j.iter()
-                                            ]
-                                            temp_grades.append(
-                                                dict(zip(t_head, t_rows))
-                                            )
-
-                            if temp_infos:
-                                self.infos.append(temp_infos)
-
-                            if temp_grades:
-                                self.grades.append(temp_grades)
-
-                if secondary.attrs["class"] == "card-header":
-                    pattern = r"School Year (\d{4}).*?(First|Second|Summer)"
-                    match = re.search(pattern, secondary.text(strip=True))
-                    self.header.append(
-                        {"Academic_Year": match.group(1), "Semester": match.group(2)}
-                    )
+        for index, card in enumerate(tree.css("div.card-theme")):
+            header, infos, rows = parse_card(card, index)
+            self.header.append(header)
+            self.infos.append(infos)
+            self.grades.append(rows)
 
     @property
     def convert_to_dict(self):
@@ -183,13 +261,15 @@ class Grade:
         Returns:
             list: A list of dictionaries containing combined data.
         """
-        combined_data = []
-        combined_data = self.header.copy()
-        for index, i in enumerate(self.infos):
-            for key, item in i.items():
-                combined_data[index].update({key: item})
-                combined_data[index].update({"grades": self.grades[index]})
-        return combined_data
+        return [
+            {**header, **infos, "grades": grades}
+            for header, infos, grades in zip(self.header, self.infos, self.grades)
+        ]
+
+    @cached_property
+    def semesters(self):
+        """The semester records, built once from the parsed lists."""
+        return tuple(GradesWrapper(**dict_obj) for dict_obj in self.convert_to_dict)
 
     def all(self):
         """Retrieves all grades from the start to the latest in descending order.
@@ -197,8 +277,7 @@ class Grade:
         Returns:
             list: A list of all semester grades from start to latest.
         """
-        datas = [GradesWrapper(**dict_obj) for dict_obj in self.convert_to_dict]
-        return datas
+        return list(self.semesters)
 
     def latest(self, has_complete_grades=False):
         """Retrieves the latest academic semester grades.
@@ -210,8 +289,8 @@ class Grade:
             GradesWrapper: An instance of the GradesWrapper class containing the latest semester grades
         """
         if has_complete_grades:
-            for i in self.convert_to_dict:
-                if GradesWrapper(**i).is_complete():
-                    return GradesWrapper(**i)
+            for i in self.semesters:
+                if i.is_complete():
+                    return i
         else:
-            return GradesWrapper(**self.convert_to_dict[0])
+            return self.semesters[0]
@@ -1,7 +1,65 @@
 from selectolax.lexbor import LexborHTMLParser
+from functools import cached_property
 from datetime import datetime
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
 from re import search
 from pupsis.utils.logs import Logger
+from pupsis.utils import html_source
+from typing import Optional, Union
+
+
+DAY_MAP = {
+    "M": "Monday",
+    "T": "Tuesday",
+    "W": "Wednesday",
+    "TH": "Thursday",
+    "F": "Friday",
+    "S": "Saturday",
+    "SUN": "Sunday",
+}
+
+# Monday is 0, like `datetime.weekday()`
+DAY_NAMES = tuple(DAY_MAP.values())
+DAY_INDEX = {day: index for index, day in enumerate(DAY_NAMES)}
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def to_minutes(value: str) -> int:
+    """Minutes since midnight of an SIS time, "07:30PM" gives 1170.
+
+    Raises:
+        ValueError: If the time is not in the `HH:MMAM`/`HH:MMPM` form.
+    """
+    value = value.strip().upper()
+    meridiem = value[-2:]
+    if meridiem not in ("AM", "PM"):
+        raise ValueError(f"Invalid time: {value} (Expected format: HH:MMAM or HH:MMPM)")
+    hour, minute = value[:-2].strip().split(":")
+    return (int(hour) % 12 + (12 if meridiem == "PM" else 0)) * 60 + int(minute)
+
+
+def format_minutes(minutes: int) -> str:
+    """The SIS form of minutes since midnight, 1170 gives "07:30PM"."""
+    hour, minute = divmod(minutes % MINUTES_PER_DAY, 60)
+    return f"{(hour - 1) % 12 + 1:02d}:{minute:02d}{'PM' if hour >= 12 else 'AM'}"
+
+
+def to_day(day: Union[int, str]) -> int:
+    """Index of a day given as an index, a name ("Thursday") or an SIS code ("TH").
+
+    Raises:
+        ValueError: If the day is not known.
+    """
+    if isinstance(day, int):
+        if 0 <= day < 7:
+            return day
+    else:
+        name = DAY_MAP.get(day.upper(), day.capitalize())
+        if name in DAY_INDEX:
+            return DAY_INDEX[name]
+    raise ValueError(f"Invalid day: {day} (Expected 0-6, a day name or one of {'/'.join(DAY_MAP)})")
 
 
 class scheduleWrapper:
@@ -17,6 +75,7 @@ class scheduleWrapper:
         start_time: str,
         end_time: str,
         faculty_name: str,
+        day: Optional[str] = None,
     ):
         self.semester = semester
         self.subject_code = subject_code
@@ -28,102 +87,322 @@ class scheduleWrapper:
         self.start_time = start_time
         self.end_time = end_time
         self.faculty_name = faculty_name
+        self.day = day
+
+    def as_dict(self):
+        """Returns the schedule entry as a dictionary."""
+        return dict(vars(self))
 
     def __repr__(self):
         return f"{self.subject_code} - {self.subject_description} - {self.section} - {self.start_time} - {self.end_time} - {self.faculty_name}"
 
 
+class Meeting:
+    """One weekly meeting of a subject, with its time as integers.
+
+    Attributes:
+        day (int): Day of the week, Monday is 0.
+        start (int): Minutes since midnight the meeting starts.
+        end (int): Minutes since midnight the meeting ends.
+        entry (scheduleWrapper): The schedule entry of the meeting.
+    """
+
+    __slots__ = ("day", "start", "end", "entry")
+
+    def __init__(self, day: int, start: int, end: int, entry: Optional[scheduleWrapper] = None):
+        self.day = day
+        self.start = start
+        self.end = end
+        self.entry = entry
+
+    @classmethod
+    def from_wrapper(cls, entry: scheduleWrapper):
+        return cls(DAY_INDEX[entry.day], to_minutes(entry.start_time), to_minutes(entry.end_time), entry)
+
+    @property
+    def day_name(self) -> str:
+        return DAY_NAMES[self.day]
+
+    @property
+    def week_start(self) -> int:
+        """Minutes since Monday midnight the meeting starts."""
+        return self.day * MINUTES_PER_DAY + self.start
+
+    @property
+    def week_end(self) -> int:
+        return self.day * MINUTES_PER_DAY + self.end
+
+    def overlaps(self, other: "Meeting") -> bool:
+        return self.week_start < other.week_end and other.week_start < self.week_end
+
+    def __repr__(self):
+        code = self.entry.subject_code if self.entry is not None else ""
+        return f"<Meeting {code} {self.day_name} {format_minutes(self.start)}-{format_minutes(self.end)}>"
+
+
+class Timetable:
+    """Interval index of the meetings of a schedule over the week.
+
+    Meetings are kept sorted by their start in minutes since Monday midnight,
+    with the running maximum of their ends. Both lists are sorted, so the
+    meetings around a time are found by bisection and only the meetings that
+    can overlap it are looked at. Free time is searched in the busy periods of
+    each day, merged once.
+
+    Attributes:
+        meetings (list): The `Meeting`s sorted by start.
+
+    Example:
+    >>> timetable = Schedule(html).timetable
+    >>> timetable.on_at("TH", "10:00AM")
+    >>> timetable.free("Friday", "7:00AM", "5:00PM", min_length=60)
+    >>> timetable.conflicts()
+    """
+
+    def __init__(self, meetings: list):
+        self.meetings = sorted(meetings, key=lambda meeting: (meeting.week_start, meeting.week_end))
+        self._starts = [meeting.week_start for meeting in self.meetings]
+        self._max_ends = list(accumulate((meeting.week_end for meeting in self.meetings), max))
+
+        # merged busy periods per day, as parallel lists of starts and ends
+        self._busy = [([], []) for _ in range(7)]
+        for meeting in self.meetings:
+            starts, ends = self._busy[meeting.day]
+            if ends and meeting.start <= ends[-1]:
+                ends[-1] = max(ends[-1], meeting.end)
+            else:
+                starts.append(meeting.start)
+                ends.append(meeting.end)
+
+    @classmethod
+    def from_wrappers(cls, entries: list):
+        return cls([Meeting.from_wrapper(entry) for entry in entries])
+
+    def __len__(self):
+        return len(self.meetings)
+
+    def __iter__(self):
+        return iter(self.meetings)
+
+    def _overlapping(self, start: int, end: int) -> list:
+        """Meetings overlapping `[start, end)` in week minutes, in start order."""
+        # meetings before `first` all end by `start`, meetings from `last` start at `end` or later
+        first = bisect_right(self._max_ends, start)
+        last = bisect_left(self._starts, end)
+        return [meeting for meeting in self.meetings[first:last] if meeting.week_end > start]
+
+    def on_at(self, day: Union[int, str, datetime], time: Union[int, str, None] = None) -> list:
+        """The meetings going on at a time.
+
+        Attributes:
+            day (int | str | datetime): The day, see `to_day`, or a datetime giving both the day and the time.
+            time (int | str): Minutes since midnight or an SIS time ("10:00AM"), needed unless `day` is a datetime.
+
+        Returns:
+            list: The `Meeting`s that started at or before the time and have not ended.
+
+        Raises:
+            ValueError: If `time` is missing and `day` is not a datetime.
+        """
+        if isinstance(day, datetime):
+            day, time = day.weekday(), day.hour * 60 + day.minute
+        elif time is None:
+            raise ValueError(f"on_at needs a time for {day!r}, or a datetime instead of the day")
+        moment = to_day(day) * MINUTES_PER_DAY + (to_minutes(time) if isinstance(time, str) else time)
+        return self._overlapping(moment, moment + 1)
+
+    def free(
+        self,
+        day: Union[int, str],
+        start: Union[int, str] = 0,
+        end: Union[int, str] = MINUTES_PER_DAY,
+        min_length: int = 0,
+    ) -> list:
+        """The free periods of a day between two times.
+
+        Attributes:
+            day (int | str): The day, see `to_day`.
+            start (int | str): Start of the search, minutes since midnight or an SIS time.
+            end (int | str): End of the search.
+            min_length (int): Leave out periods shorter than this many minutes.
+
+        Returns:
+            list: `(start, end)` in minutes since midnight of each free period, see `format_minutes`.
+        """
+        start = to_minutes(start) if isinstance(start, str) else start
+        end = to_minutes(end) if isinstance(end, str) else end
+        starts, ends = self._busy[to_day(day)]
+
+        slots = []
+        cursor = start
+        for index in range(bisect_right(ends, start), len(starts)):
+            if starts[index] >= end:
+                break
+            if starts[index] - cursor >= max(min_length, 1):
+                slots.append((cursor, starts[index]))
+            cursor = max(cursor, ends[index])
+        if end - cursor >= max(min_length, 1):
+            slots.append((cursor, end))
+        return slots
+
+    def conflicts_with(self, day: Union[int, str], start: Union[int, str], end: Union[int, str]) -> list:
+        """The meetings overlapping a period of a day, e.g. a subject to be added."""
+        base = to_day(day) * MINUTES_PER_DAY
+        start = to_minutes(start) if isinstance(start, str) else start
+        end = to_minutes(end) if isinstance(end, str) else end
+        return self._overlapping(base + start, base + end)
+
+    def conflicts(self) -> list:
+        """Every pair of meetings that overlap, as `(earlier, later)` tuples."""
+        pairs = []
+        for index, meeting in enumerate(self.meetings):
+            last = bisect_left(self._starts, meeting.week_end, index + 1)
+            pairs.extend((meeting, other) for other in self.meetings[index + 1:last])
+        return pairs
+
+    def __repr__(self):
+        return f"<Timetable of {len(self.meetings)} meetings>"
+
+
 class Schedule:
-    def __init__(self, html_data: str, log_file=None, log_level=None):
-        self.html_data = html_data
-        self.head
-        self.body
-        if log_level:
-            self.logger = Logger("Schedule", log_file=log_file, level=log_level)
-        # self.sched()
+    """Parses the HTML data from the pupSIS schedule page.
+
+    The page is parsed once, on first access, and every property reads from
+    the same tree and the same extraction pass.
+
+    Attributes:
+        html_data (str | bytes): The HTML data, bytes, memoryview and mmap input is parsed without decoding.
+        parse_cache (ParseCache): Reuse the parsed result of a page seen before.
+
+    Returns:
+        head: The column names of the schedule table.
+        body: The rows of the schedule table.
+        get_schedule(): The schedule as a list of scheduleWrapper.
+    """
+
+    def __init__(self, html_data: str, log_file=None, log_level=None, parse_cache=None):
+        self.html_data = html_data = html_source(html_data)
+        self.logger = Logger("Schedule", log_file=log_file, level=log_level)
+        if parse_cache is not None:
+            title, head, rows = parse_cache.fetch("schedule", html_data, self.record)
+            # meetings come back from the disk tier as lists
+            for row in rows:
+                row[6] = [tuple(meeting) for meeting in row[6]]
+            self.__dict__.update(title=title, head=head, _rows=rows)
+
+    def record(self):
+        """Parses the page and returns `[title, head, rows]`, the form kept by `ParseCache`."""
+        return [self.title, self.head, self._rows]
+
+    @cached_property
+    def tree(self):
+        return LexborHTMLParser(self.html_data)
+
+    @cached_property
+    def title(self):
+        node = self.tree.css_first("section h1")
+        return node.text(strip=True) if node else None
 
     @property
     def school_year(self):
-        tree = LexborHTMLParser(self.html_data)
         try:
             pattern = r'\b\d{4}\b'
-            return search(pattern, tree.css_first("section h1").text(strip=True)).group()
+            return search(pattern, self.title).group()
         except Exception as e:
-            self.logger.error(f"Error extracting the school year {e}")
+            self.logger.error("Error extracting the school year %s", e)
 
     @property
     def semester(self):
-        tree = LexborHTMLParser(self.html_data)
-        try:
-            return tree.css_first("section h1").text(strip=True)
-        except Exception as e:
-            self.logger.error(f"Error extracting the semester {e}")
+        if self.title is None:
+            self.logger.error("Error extracting the semester")
+        return self.title
 
-    @property
+    @cached_property
     def head(self):
-        tree = LexborHTMLParser(self.html_data)
-        user_sched = tree.css("div.card-body div.table-responsive table thead tr")
+        user_sched = self.tree.css_first("div.card-body div.table-responsive table thead tr")
         try:
-            return [x.text() for x in user_sched[0].css("th")]
+            return [x.text() for x in user_sched.css("th")]
         except Exception as e:
-            self.logger.error(f"Error extracting the schedule head {e}")
+            self.logger.error("Error extracting the schedule head %s", e)
 
-    @property
+    @cached_property
     def body(self):
-        tree = LexborHTMLParser(self.html_data)
+        return [row[:-1] for row in self._rows]
+
+    @cached_property
+    def _rows(self):
+        """Extracts every row of the schedule table in one pass.
+
+        Returns:
+            list: `[#, subject_code, description, lec, lab, section, [(day, start, end), ...], faculty_name, units]`
+        """
         sched = []
-        user_sched = tree.css("div.card-body div.table-responsive table tbody tr")
-        for tr in user_sched:
-            temp_sched = []
-            for index, td in enumerate(tr.css("td")):
-
-                # extract the subject_code
-                if index in range(0, 5):
-                    temp_sched.append(td.text(strip=True))
-
-                if index == len(tr.css("td")) - 1:
-                    last_td = (td.text(strip=True)).split(" - ")
-
-                    # extract the course section
-                    temp_sched.append(last_td[1])
-
-                    # extract the schedule
-                    day, *times = last_td[2].replace("Faculty:", "").split(" ")
-
-                    # extract the day and time
-                    day_map = {
-                        "M": "Monday",
-                        "T": "Tuesday",
-                        "W": "Wednesday",
-                        "TH": "Thursday",
-                        "F": "Friday",
-                        "S": "Saturday",
-                        "SUN": "Sunday",
-                    }
-                    sched_time = []
-                    day = day.split("/")
-                    times = times[0].split("/")
-
-                    for day_abbr, time_abbr in zip(day, times):
-                        day = day_map[day_abbr]
-                        start_time_str, end_time_str = time_abbr.split("-")
-                        sched_time.append((day, start_time_str, end_time_str))
-                    temp_sched.append(sched_time)
-                    # get the faculty name
-                    faculty_name = td.css_first("font").text(strip=True)
-                    if faculty_name in "Faculty:":
-                        temp_sched.append(None)
-                    else:
-                        temp_sched.append(faculty_name.replace("Faculty: ", ""))
+        for tr in self.tree.css("div.card-body div.table-responsive table tbody tr"):
+            tds = tr.css("td")
+
+            # extract the subject_code
+            temp_sched = [td.text(strip=True) for td in tds[:5]]
+
+            last_td = tds[-1]
+            details = (last_td.text(strip=True)).split(" - ")
+
+            # extract the course section
+            temp_sched.append(details[1])
+
+            # extract the schedule
+            day, *times = details[2].replace("Faculty:", "").split(" ")
 
+            # extract the day and time
+            sched_time = []
+            for day_abbr, time_abbr in zip(day.split("/"), times[0].split("/")):
+                start_time_str, end_time_str = time_abbr.split("-")
+                sched_time.append((DAY_MAP[day_abbr], start_time_str, end_time_str))
+            temp_sched.append(sched_time)
+
+            # get the faculty name
+            faculty_name = last_td.css_first("font").text(strip=True)
+            if faculty_name in "Faculty:":
+                temp_sched.append(None)
+            else:
+                temp_sched.append(faculty_name.replace("Faculty: ", ""))
+
+            # units are not part of `body`, kept for `get_schedule`
+            temp_sched.append(tds[5].text(strip=True) if len(tds) > 6 else None)
             sched.append(temp_sched)
         return sched
 
+    @cached_property
+    def timetable(self):
+        """The meetings of the schedule as a `Timetable`, indexed for time queries."""
+        return Timetable.from_wrappers(self._wrappers)
+
     # class function
     def get_schedule(self):
         """exports the schedule to a list of scheduleWrapper
 
+        Subjects that meet on several days give one scheduleWrapper per meeting.
+
         Returns:
             list: list of scheduleWrapper
         """
-        pass
\ No newline at end of file
+        return self._wrappers.copy()
+
+    @cached_property
+    def _wrappers(self):
+        return [
+            scheduleWrapper(
+                semester=self.semester,
+                subject_code=code,
+                subject_description=description,
+                section=section,
+                units=units,
+                lab=lab,
+                lec=lec,
+                start_time=start_time,
+                end_time=end_time,
+                faculty_name=faculty_name,
+                day=day,
+            )
+            for _, code, description, lec, lab, section, meetings, faculty_name, units in self._rows
+            for day, start_time, end_time in meetings
+        ]
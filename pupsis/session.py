@@ -0,0 +1,133 @@
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional, Union
+import json
+import os
+import time
+
+if TYPE_CHECKING:
+    import httpx
+
+
+class SessionStore:
+    """Saves SIS cookie jars on disk with the mirror of their session, one JSON file per student number.
+
+    Attributes:
+        base_path (str): The directory where the cookie jars are saved.
+
+    Example:
+    >>> store = SessionStore(".cache/pupsis/sessions")
+    >>> student = PUPSIS(student_number="2020-12345-MN-0", ..., session_store=store)
+    """
+
+    def __init__(self, base_path: Optional[Union[str, Path]] = None):
+        self.base_path = Path(base_path) if base_path is not None else Path(".cache/pupsis/sessions")
+
+    def _path(self, student_number: str) -> Path:
+        return self.base_path / f"{student_number}.json"
+
+    def load(self, student_number: str) -> Optional[dict]:
+        """Returns the saved session of a student, or None if nothing is saved.
+
+        The session is `{"mirror": url, "cookies": [...]}`, the mirror is None
+        in files saved before it was recorded. Expired cookies are dropped, an
+        empty jar counts as nothing saved.
+        """
+        try:
+            with open(self._path(student_number), "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if isinstance(data, list):
+            data = {"mirror": None, "cookies": data}
+
+        now = time.time()
+        cookies = [c for c in data.get("cookies", []) if c.get("expires") is None or c["expires"] > now]
+        if not cookies:
+            return None
+        return {"mirror": data.get("mirror"), "cookies": cookies}
+
+    def save(self, student_number: str, cookies: "httpx.Cookies", mirror: Optional[str] = None):
+        """Writes the cookie jar of a student and the mirror its session is on, readable by the owner only."""
+        if not self.base_path.is_dir():
+            self.base_path.mkdir(parents=True)
+            # keep the saved sessions out of version control
+            with open(self.base_path / ".gitignore", "w") as file:
+                file.write("*")
+
+        data = {
+            "mirror": mirror,
+            "cookies": [
+                {
+                    "name": cookie.name,
+                    "value": cookie.value,
+                    "domain": cookie.domain,
+                    "path": cookie.path,
+                    "expires": cookie.expires,
+                }
+                for cookie in cookies.jar
+            ],
+        }
+        path = self._path(student_number)
+        tmp_path = path.with_suffix(".tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as file:
+            json.dump(data, file)
+        os.replace(tmp_path, path)
+
+    def delete(self, student_number: str):
+        """Removes the saved cookie jar of a student."""
+        self._path(student_number).unlink(missing_ok=True)
+
+
+class SessionManager:
+    """Keeps one logged-in requester of a `PUPSIS` instance alive between calls.
+
+    The requester and its cookie jar are reused by every `grades()` and
+    `schedule()` call, so only the first one logs in. With a `SessionStore`
+    the cookie jar is also saved after each fetch and restored by the next
+    process, which then resumes the session instead of logging in again.
+
+    Attributes:
+        student_number (str): The key of the saved cookie jar.
+        store (SessionStore): Where to save the cookie jar, None keeps it in memory only.
+    """
+
+    def __init__(self, student_number: Optional[str] = None, store: Optional[SessionStore] = None):
+        self.student_number = student_number
+        self.store = store
+        self.api = None
+
+    def requester(self, build: Callable):
+        """Returns the current requester, building one with `build` on first use.
+
+        A new requester starts from the saved cookie jar if there is one, if
+        that session expired the next fetch logs in again.
+        """
+        if self.api is None:
+            self.api = build()
+            if self.store and self.student_number:
+                session = self.store.load(self.student_number)
+                if session:
+                    for cookie in session["cookies"]:
+                        self.api.client.cookies.set(
+                            cookie["name"], cookie["value"], domain=cookie["domain"], path=cookie["path"]
+                        )
+                    self.api.is_logged_in = True
+                    # the session only exists on the mirror it was pinned to, the jar
+                    # can still hold the cookies of a mirror it was on before
+                    mirror = session["mirror"]
+                    if mirror not in self.api.mirrors.urls:
+                        mirror = self.api.mirrors.mirror_for_host(session["cookies"][0]["domain"].lstrip("."))
+                    self.api.mirror = mirror
+        return self.api
+
+    def save(self):
+        """Saves the cookie jar of the current requester, if logged in."""
+        if self.store and self.student_number and self.api is not None and self.api.is_logged_in:
+            self.store.save(self.student_number, self.api.client.cookies, self.api.mirror)
+
+    def reset(self):
+        """Drops the current requester and its saved cookie jar, forcing a new login."""
+        self.api = None
+        if self.store and self.student_number:
+            self.store.delete(self.student_number)
@@ -0,0 +1,249 @@
+import asyncio
+import random
+import secrets
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Optional, Tuple, Union
+from urllib.parse import parse_qs
+
+import httpx
+
+
+LOGIN_PAGE = """<html><head><title>PUP Student Information System</title></head><body>
+<form method="post" action="/student/">
+<input type="hidden" name="csrf_token" value="{token}">
+<input type="hidden" id="tempcsrf" name="csrf_token" value="{token}">
+</form></body></html>"""
+
+DASHBOARD_PAGE = "<html><head><title>Dashboard - PUPSIS</title></head><body><h1>Dashboard</h1></body></html>"
+
+GRADES_PAGE = """<html><head><title>Grades - PUPSIS</title></head><body>
+<div class="card card-theme"><div class="card-header"><h3 class="card-title">School Year 2024 - 2025 First Semester</h3></div>
+<div class="card-body"><div class="row"><dl><dt>Student Status</dt><dd>Regular</dd><dt>Scholastic Status</dt><dd>Good Standing</dd></dl></div>
+<div class="table-responsive"><table class="table"><thead><tr><th>#</th><th>Subject Code</th><th>Description</th><th>Faculty Name</th><th>Units</th><th>Final Grade</th><th>Grade Status</th></tr></thead>
+<tbody><tr><td>1</td><td>COMP 013</td><td>Human Computer Interaction</td><td>DOE,JANE BUSH</td><td>3.0</td><td>1.25</td><td>PASSED</td></tr></tbody></table></div></div></div>
+</body></html>"""
+
+SCHEDULE_PAGE = """<html><head><title>School Year 2425 - First Semester - PUPSIS</title></head><body>
+<section class="content-header"><h1>School Year 2425 - First Semester</h1></section>
+<section class="content"><div class="card"><div class="card-body"><div class="table-responsive"><table id="Subject" class="table">
+<thead><tr><th>#</th><th>Subject Code</th><th>Description</th><th>Lec</th><th>Lab</th><th>Unit</th><th>Schedule</th></tr></thead>
+<tbody><tr><td>1</td><td>COMP 013</td><td>Human Computer Interaction</td><td>3.0</td><td>0.0</td><td>3.0</td>
+<td>5 - BSCS 3-1 - T/F 07:30PM-09:00PM/07:30PM-09:00PM<br><font class="text-xs pt-1 pb-0">Faculty: DOE,JANE BUSH</font></td></tr></tbody>
+</table></div></div></div></section></body></html>"""
+
+
+# shown on the login page SIS sends back to after wrong credentials, a refused CSRF token gets no message
+LOGIN_ERROR = '<div class="alert alert-danger">Invalid student number, birthdate or password.</div>'
+
+
+class HostProfile:
+    """How one stand-in mirror behaves, can be changed while requests run.
+
+    Attributes:
+        latency (float): Seconds added to every response.
+        jitter (float): Up to this many random seconds added on top of `latency`.
+        error_rate (float): Share of requests answered with `error_status`.
+        error_status (int): Status of the failed responses.
+        down (bool): Refuse connections, like a mirror that is offline.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        down: bool = False,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.down = down
+
+    def __repr__(self):
+        return (
+            f"HostProfile(latency={self.latency}, jitter={self.jitter}, error_rate={self.error_rate}, "
+            f"error_status={self.error_status}, down={self.down})"
+        )
+
+
+class SISStandIn(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """A local stand-in of the SIS mirrors, used as the transport of a requester.
+
+    Emulates the CSRF login page, the login POST and its `Refresh` header
+    outcomes (success, wrong credentials, a refused CSRF token, `lockaccount`), and the
+    `dashboard`, `grades` and `schedule` pages of a logged in session.
+    Sessions belong to the mirror that issued them. Each host gets its own
+    latency, error rate and outage switch, so mirror fallback and login
+    behaviour can be load tested without the network.
+
+    Attributes:
+        accounts (dict): `{student_number: (birthdate, password)}`, None accepts any credentials.
+        pages (dict): Body of `grades`/`schedule`/`dashboard`, a str, bytes, or a callable
+            taking the student number.
+        hosts (dict): `HostProfile` by host name, hosts not listed answer at once.
+        lockout_after (int): Failed logins of a student before the account is locked.
+        session_ttl (float): Seconds a session stays valid, None never expires.
+        csrf_ttl (float): Seconds a CSRF token of the login page can be posted, on the host that issued it.
+        seed (int): Seed of the latency jitter and of the injected errors.
+        requests (Counter): Requests served, by `(host, method, endpoint)`.
+        logins (Counter): Login outcomes, `success`, `invalid`, `invalid_csrf` and `locked`.
+
+    Example:
+    >>> sis = SISStandIn(hosts={"sis8.pup.edu.ph": HostProfile(down=True), "sis1.pup.edu.ph": HostProfile(latency=0.05)})
+    >>> student = PUPSIS("2020-12345-MN-0", "1/02/2003", "mypassword", transport=sis)
+    >>> student.grades()
+    >>> sis.requests
+    """
+
+    def __init__(
+        self,
+        accounts: Optional[Dict[str, Tuple[str, str]]] = None,
+        pages: Optional[Dict[str, Union[str, bytes, Callable[[str], Union[str, bytes]]]]] = None,
+        hosts: Optional[Dict[str, HostProfile]] = None,
+        lockout_after: int = 3,
+        session_ttl: Optional[float] = None,
+        csrf_ttl: float = 1800.0,
+        seed: Optional[int] = None,
+    ):
+        self.accounts = accounts
+        self.pages = {"dashboard": DASHBOARD_PAGE, "grades": GRADES_PAGE, "schedule": SCHEDULE_PAGE, **(pages or {})}
+        self.hosts = hosts if hosts is not None else {}
+        self.lockout_after = lockout_after
+        self.session_ttl = session_ttl
+        self.csrf_ttl = csrf_ttl
+        self.random = random.Random(seed)
+        self.requests = Counter()
+        self.logins = Counter()
+
+        self._lock = threading.Lock()
+        self._tokens = {}
+        self._sessions = {}
+        self._failures = Counter()
+
+    def profile(self, host: str):
+        return self.hosts.get(host) or HostProfile()
+
+    def handle_request(self, request: httpx.Request):
+        delay, failure = self._plan(request)
+        if delay:
+            time.sleep(min(delay, self._read_timeout(request)))
+        return self._respond(request, delay, failure)
+
+    async def handle_async_request(self, request: httpx.Request):
+        delay, failure = self._plan(request)
+        if delay:
+            await asyncio.sleep(min(delay, self._read_timeout(request)))
+        return self._respond(request, delay, failure)
+
+    def _plan(self, request: httpx.Request):
+        """Picks the latency and whether the request fails, before any waiting."""
+        profile = self.profile(request.url.host)
+        if profile.down:
+            raise httpx.ConnectError(f"{request.url.host} is down", request=request)
+        with self._lock:
+            delay = profile.latency + (self.random.uniform(0, profile.jitter) if profile.jitter else 0.0)
+            failure = profile.error_status if self.random.random() < profile.error_rate else None
+        return delay, failure
+
+    @staticmethod
+    def _read_timeout(request: httpx.Request):
+        timeout = request.extensions.get("timeout", {}).get("read")
+        return float("inf") if timeout is None else timeout
+
+    def _respond(self, request: httpx.Request, delay: float, failure: Optional[int]):
+        if delay > self._read_timeout(request):
+            raise httpx.ReadTimeout(f"{request.url.host} took longer than {self._read_timeout(request)}s", request=request)
+
+        host = request.url.host
+        endpoint = request.url.path.removeprefix("/student").strip("/")
+        with self._lock:
+            self.requests[(host, request.method, endpoint)] += 1
+        if failure is not None:
+            return httpx.Response(failure, text="Service Unavailable")
+
+        if endpoint == "":
+            if request.method == "POST":
+                return self._login(request)
+            return self._login_page(host)
+        if endpoint not in self.pages:
+            return httpx.Response(404, text="Not Found")
+
+        student_number = self._session(request)
+        if student_number is None:
+            # SIS sends expired sessions back to the login page
+            return httpx.Response(200, text=self._login_page(host).text, headers={"Refresh": f"0;url={self._url(host)}"})
+        page = self.pages[endpoint]
+        body = page(student_number) if callable(page) else page
+        return httpx.Response(200, content=body.encode() if isinstance(body, str) else body,
+                              headers={"Content-Type": "text/html; charset=UTF-8"})
+
+    @staticmethod
+    def _url(host: str, path: str = ""):
+        return f"https://{host}/student/{path}"
+
+    def _login_page(self, host: str):
+        token = secrets.token_hex(16)
+        now = time.monotonic()
+        with self._lock:
+            if len(self._tokens) > 4096:
+                self._tokens = {key: value for key, value in self._tokens.items() if value[1] > now}
+            self._tokens[token] = (host, now + self.csrf_ttl)
+        return httpx.Response(200, text=LOGIN_PAGE.format(token=token), headers={"Content-Type": "text/html; charset=UTF-8"})
+
+    def _login(self, request: httpx.Request):
+        host = request.url.host
+        form = {key: values[-1] for key, values in parse_qs(request.content.decode()).items()}
+        student_number = form.get("studno", "")
+        birthdate = "/".join(form.get(key, "") for key in ("SelectMonth", "SelectDay", "SelectYear"))
+
+        with self._lock:
+            if self._failures[student_number] >= self.lockout_after:
+                self.logins["locked"] += 1
+                return self._refresh(host, "authentication/lockaccount")
+
+            token_host, token_expires = self._tokens.get(form.get("csrf_token"), (None, 0))
+            if token_host != host or time.monotonic() > token_expires:
+                self.logins["invalid_csrf"] += 1
+                return self._refresh(host, "")
+
+            if self.accounts is not None and self.accounts.get(student_number) != (birthdate, form.get("password")):
+                self._failures[student_number] += 1
+                self.logins["invalid"] += 1
+                return self._refresh(host, "", LOGIN_ERROR)
+
+            self._failures.pop(student_number, None)
+            self.logins["success"] += 1
+            session_id = secrets.token_hex(16)
+            expires = None if self.session_ttl is None else time.monotonic() + self.session_ttl
+            self._sessions[session_id] = (host, student_number, expires)
+
+        response = self._refresh(host, "dashboard")
+        response.headers["Set-Cookie"] = f"PHPSESSID={session_id}; path=/"
+        return response
+
+    def _refresh(self, host: str, path: str, text: str = ""):
+        return httpx.Response(200, text=text, headers={"Refresh": f"0;url={self._url(host, path)}"})
+
+    def _session(self, request: httpx.Request):
+        """Returns the student of the request's session, None if it has none on this host."""
+        cookies = dict(
+            part.strip().split("=", 1) for part in request.headers.get("Cookie", "").split(";") if "=" in part
+        )
+        session_id = cookies.get("PHPSESSID")
+        with self._lock:
+            host, student_number, expires = self._sessions.get(session_id, (None, None, None))
+            if host != request.url.host:
+                return None
+            if expires is not None and time.monotonic() > expires:
+                del self._sessions[session_id]
+                return None
+        return student_number
+
+    def expire_sessions(self):
+        """Ends every session, like SIS logging everyone out."""
+        with self._lock:
+            self._sessions.clear()
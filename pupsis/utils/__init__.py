@@ -1,19 +1,43 @@
+import importlib
+import mmap
 
 
-def get_stream_file(file_path):
+def get_stream_file(file_path, binary=False):
     """
     Returns the content of a file as a string.
 
     Attributes:
         file_path (str): The path to the file.
+        binary (bool): Return the raw bytes, without decoding them.
 
     Returns:
-        str: The content of the file.
+        str: The content of the file, bytes if `binary` is set.
     """
-    with open(file_path, 'r') as file:
+    with open(file_path, 'rb' if binary else 'r') as file:
         content = file.read()
     return content
 
+
+def html_source(html_data):
+    """
+    Returns HTML input in a form the Lexbor parser takes.
+
+    `str` and `bytes` are returned as is, bytes are parsed without being
+    decoded first. `bytearray`, `memoryview` and `mmap` objects are copied
+    into `bytes`, the parser does not read from buffers directly.
+
+    Attributes:
+        html_data (str | bytes | bytearray | memoryview | mmap): The page.
+
+    Returns:
+        str | bytes: The page.
+    """
+    if isinstance(html_data, (str, bytes)):
+        return html_data
+    if isinstance(html_data, (bytearray, memoryview, mmap.mmap)):
+        return bytes(html_data)
+    raise TypeError(f"Expected str, bytes, memoryview or mmap HTML data, got {type(html_data).__name__}")
+
 def dump_stream_file(output_file_path, content):
     """
     Writes content to a file.
@@ -23,4 +47,22 @@ def dump_stream_file(output_file_path, content):
         content (str): The content to write.
     """
     with open(output_file_path, 'w') as file:
-        file.write(content)
\ No newline at end of file
+        file.write(content)
+
+class LazyImport:
+    """Class attribute that imports `module` and returns its `name` on first access.
+
+    Keeps heavy modules, like the HTTP stack, out of `import pupsis` until
+    they are used.
+
+    Example:
+    >>> class PUPSIS:
+    ...     requester_class = LazyImport("pupsis.api", "APIRequester")
+    """
+
+    def __init__(self, module: str, name: str):
+        self.module = module
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        return getattr(importlib.import_module(self.module), self.name)
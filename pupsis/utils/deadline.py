@@ -0,0 +1,83 @@
+import time
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import httpx
+
+from pupsis.errors import DeadlineExceeded
+
+
+class Deadline:
+    """An end-to-end time budget for one call, split across its steps and mirror attempts.
+
+    The caller plans how many steps (CSRF, login, fetch...) are left. Every
+    attempt of a step, including the fallbacks to other mirrors, gets an even
+    share of what remains of the budget between the steps still left, so time a
+    step does not use goes to the next ones. Attempts are also capped by the
+    connect and read limits, so a dead mirror costs at most `connect` seconds
+    before the next one is tried.
+
+    Attributes:
+        seconds (float): The total budget, None for no overall limit.
+        connect (float): Limit for establishing a connection, per attempt.
+        read (float): Limit for reading a response, per attempt.
+
+    Example:
+    >>> deadline = Deadline(8.0, connect=3.0, read=20.0)
+    >>> deadline.plan(3)  # csrf, login, fetch
+    >>> client.get(url, timeout=deadline.timeout())
+    >>> deadline.step_done()
+    """
+
+    def __init__(self, seconds: Optional[float] = None, connect: Optional[float] = None, read: float = 100.0):
+        self.seconds = seconds
+        self.connect = connect
+        self.read = read
+        self.started = time.monotonic()
+        self.expires = None if seconds is None else self.started + seconds
+        self.steps = 0
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left in the budget, None without an overall limit."""
+        if self.expires is None:
+            return None
+        return self.expires - time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def plan(self, steps: int):
+        """Adds `steps` to the number of steps left in the call."""
+        self.steps += steps
+
+    def step_done(self):
+        """Marks the current step as finished."""
+        self.steps = max(self.steps - 1, 0)
+
+    def check(self, step: str):
+        """Raises `DeadlineExceeded` if the budget ran out before `step`."""
+        if self.expired:
+            raise DeadlineExceeded(self.seconds, step)
+
+    def capped(self, timeout: "httpx.Timeout") -> bool:
+        """Checks if the budget, not the read limit, set the timeout of an attempt."""
+        return timeout.read < self.read
+
+    def timeout(self) -> "httpx.Timeout":
+        """The httpx timeout of the next attempt, capped by the share of the current step."""
+        read, connect = self.read, self.connect if self.connect is not None else self.read
+        remaining = self.remaining()
+        if remaining is not None:
+            share = max(remaining / max(self.steps, 1), 0.001)
+            read, connect = min(read, share), min(connect, share)
+        import httpx
+
+        return httpx.Timeout(read, connect=connect)
+
+
+def deadline_of(request: "httpx.Request") -> Optional[Deadline]:
+    """The `Deadline` a requester attached to `request`, None without one or without an overall limit."""
+    deadline = request.extensions.get("pupsis_deadline")
+    return deadline if deadline is not None and deadline.expires is not None else None
@@ -0,0 +1,304 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from hashlib import blake2b
+from pathlib import Path
+from typing import Optional, Union
+
+import hishel
+from hishel._utils import normalized_url
+
+
+# seconds a response of each SIS endpoint stays fresh, 0 never stores it.
+# the login page is never cached: its CSRF token and session cookie belong
+# to a single login.
+DEFAULT_TTLS = {
+    "": 0,
+    "dashboard": 0,
+    "grades": 30,
+    "schedule": 300,
+}
+
+
+def session_cache_key(request, body: bytes = b"") -> str:
+    """Cache key of a request, including its cookies.
+
+    hishel keys responses by method and URL only, which would hand the
+    grades page of one student to the next one in the same cache. Adding the
+    Cookie header keeps cached pages private to the session that fetched them.
+    """
+    key = blake2b(digest_size=16, usedforsecurity=False)
+    key.update(request.method)
+    key.update(normalized_url(request.url).encode("ascii"))
+    key.update(body)
+    for name, value in request.headers:
+        if name.lower() == b"cookie":
+            key.update(value)
+    return key.hexdigest()
+
+
+def body_size(response) -> int:
+    """Size of the body of a stored response, 0 if it was not read yet."""
+    try:
+        return len(response.content)
+    except Exception:
+        return 0
+
+
+class CacheStats:
+    """Hit, miss and byte counters of an HTTP cache.
+
+    Attributes:
+        hits (int): Lookups that found a fresh stored response.
+        misses (int): Lookups that found nothing, or only an expired response.
+        stores (int): Responses written to the storage.
+        evictions (int): Responses removed to stay under the size cap.
+        bytes_served (int): Body bytes served from the cache.
+        bytes_stored (int): Body bytes written to the cache.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.bytes_served = 0
+        self.bytes_stored = 0
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+    def __repr__(self):
+        return f"<CacheStats hits={self.hits} misses={self.misses} bytes_served={self.bytes_served}>"
+
+
+class CachePolicy:
+    """Per-endpoint TTLs, the size cap and the counters shared by a cache storage."""
+
+    def __init__(self, ttls: dict, default_ttl: float, max_entries: Optional[int], max_bytes: Optional[int]):
+        self.ttls = ttls
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self.sizes = OrderedDict()  # key -> body size, in LRU order
+        self.lock = threading.Lock()
+
+    def ttl(self, request) -> float:
+        endpoint = request.url.target.decode("ascii").split("?")[0].rstrip("/").rsplit("/", 1)[-1]
+        endpoint = "" if endpoint == "student" else endpoint
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def on_retrieve(self, key: str, stored) -> bool:
+        """Counts a lookup, returns False if the stored response expired for its endpoint."""
+        with self.lock:
+            if stored is None:
+                self.stats.misses += 1
+                return False
+            response, request, metadata = stored
+            age = time.time() - metadata["created_at"].timestamp()
+            if age > self.ttl(request):
+                self.stats.misses += 1
+                return False
+            self.stats.hits += 1
+            self.stats.bytes_served += self.sizes.get(key) or body_size(response)
+            if key in self.sizes:
+                self.sizes.move_to_end(key)
+            return True
+
+    def on_store(self, key: str, response, request) -> Optional[list]:
+        """Returns the keys to evict, or None if the response must not be stored."""
+        if request.method != b"GET" or self.ttl(request) <= 0:
+            return None
+        size = body_size(response)
+
+        with self.lock:
+            self.stats.stores += 1
+            self.stats.bytes_stored += size
+            self.sizes[key] = size
+            self.sizes.move_to_end(key)
+            evicted = []
+            while self.sizes and (
+                (self.max_entries is not None and len(self.sizes) > self.max_entries)
+                or (self.max_bytes is not None and sum(self.sizes.values()) > self.max_bytes)
+            ):
+                old_key, _ = self.sizes.popitem(last=False)
+                if old_key == key:
+                    break
+                evicted.append(old_key)
+            self.stats.evictions += len(evicted)
+            return evicted
+
+
+class PolicyStorage(hishel.BaseStorage):
+    """Wraps a hishel storage to apply a `CachePolicy`."""
+
+    def __init__(self, storage: hishel.BaseStorage, policy: CachePolicy):
+        super().__init__()
+        self.storage = storage
+        self.policy = policy
+
+    def store(self, key, response, request, metadata=None):
+        evicted = self.policy.on_store(key, response, request)
+        if evicted is None:
+            return
+        self.storage.store(key, response, request, metadata)
+        for old_key in evicted:
+            self.storage.remove(old_key)
+
+    def retrieve(self, key):
+        stored = self.storage.retrieve(key)
+        return stored if self.policy.on_retrieve(key, stored) else None
+
+    def remove(self, key):
+        self.storage.remove(key)
+
+    def update_metadata(self, key, response, request, metadata):
+        self.storage.update_metadata(key, response, request, metadata)
+
+    def close(self):
+        # shared by every client of the config, closed by `CacheConfig.close`
+        pass
+
+
+class AsyncPolicyStorage(hishel.AsyncBaseStorage):
+    """Asyncio version of `PolicyStorage`."""
+
+    def __init__(self, storage: hishel.AsyncBaseStorage, policy: CachePolicy):
+        super().__init__()
+        self.storage = storage
+        self.policy = policy
+
+    async def store(self, key, response, request, metadata=None):
+        evicted = self.policy.on_store(key, response, request)
+        if evicted is None:
+            return
+        await self.storage.store(key, response, request, metadata)
+        for old_key in evicted:
+            await self.storage.remove(old_key)
+
+    async def retrieve(self, key):
+        stored = await self.storage.retrieve(key)
+        return stored if self.policy.on_retrieve(key, stored) else None
+
+    async def remove(self, key):
+        await self.storage.remove(key)
+
+    async def update_metadata(self, key, response, request, metadata):
+        await self.storage.update_metadata(key, response, request, metadata)
+
+    async def aclose(self):
+        pass
+
+
+class CacheConfig:
+    """Configures the HTTP cache used by the requesters.
+
+    Attributes:
+        backend (str): Where responses are stored, "memory" (LRU), "file" or "sqlite",
+            sqlite needs the `sqlite` extra (`pip install pupsis.py[sqlite]`).
+        path (str): The cache directory ("file") or database file ("sqlite").
+        ttls (dict): Seconds a response stays fresh per SIS endpoint ("" is the login page),
+            0 never stores it. Merged over `DEFAULT_TTLS`.
+        default_ttl (float): TTL of endpoints missing from `ttls`.
+        max_entries (int): Size cap in number of responses, oldest used evicted first.
+        max_bytes (int): Size cap in body bytes.
+
+    POST requests (the login) are never cached.
+
+    Raises:
+        ImportError: If `backend` is "sqlite" and the anysqlite package is not installed.
+
+    Example:
+    >>> cache = CacheConfig(backend="sqlite", path=".cache/pupsis.sqlite", ttls={"grades": 60})
+    >>> student = PUPSIS(..., cache=cache)
+    >>> student.grades()
+    >>> cache.stats
+    """
+
+    def __init__(
+        self,
+        backend: str = "file",
+        path: Optional[Union[str, Path]] = None,
+        ttls: Optional[dict] = None,
+        default_ttl: float = 30,
+        max_entries: Optional[int] = 256,
+        max_bytes: Optional[int] = None,
+    ):
+        if backend not in ("memory", "file", "sqlite"):
+            raise ValueError(f"Unknown cache backend: {backend} (Expected memory, file or sqlite)")
+        if backend == "sqlite":
+            try:
+                import anysqlite  # noqa: F401
+            except ImportError:
+                raise ImportError(
+                    "The sqlite cache needs the anysqlite package, install it with `pip install pupsis.py[sqlite]`."
+                )
+        self.backend = backend
+        self.path = path
+        self.policy = CachePolicy({**DEFAULT_TTLS, **(ttls or {})}, default_ttl, max_entries, max_bytes)
+        self.controller = hishel.Controller(
+            cacheable_methods=["GET"],
+            allow_heuristics=True,
+            force_cache=True,
+            key_generator=session_cache_key,
+        )
+        self._storage = None
+        self._async_storage = None
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.policy.stats
+
+    @property
+    def max_ttl(self) -> float:
+        return max([self.policy.default_ttl, *self.policy.ttls.values()])
+
+    def close(self):
+        """Closes the storages shared by the clients, they are reopened when used again."""
+        with self._lock:
+            storage, self._storage = self._storage, None
+            self._async_storage = None
+        if storage is not None:
+            storage.storage.close()
+
+    def _sqlite_connection(self) -> sqlite3.Connection:
+        path = Path(self.path or ".cache/pupsis.sqlite")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return sqlite3.connect(path, check_same_thread=False)
+
+    def storage(self) -> PolicyStorage:
+        """The storage of the blocking clients, created on first use and shared."""
+        with self._lock:
+            if self._storage is None:
+                if self.backend == "memory":
+                    inner = hishel.InMemoryStorage(ttl=self.max_ttl, capacity=self.policy.max_entries or 128)
+                elif self.backend == "file":
+                    inner = hishel.FileStorage(base_path=self.path, ttl=self.max_ttl, check_ttl_every=10)
+                else:
+                    inner = hishel.SQLiteStorage(connection=self._sqlite_connection(), ttl=self.max_ttl)
+                self._storage = PolicyStorage(inner, self.policy)
+            return self._storage
+
+    def async_storage(self) -> AsyncPolicyStorage:
+        """The storage of the asyncio clients, created on first use and shared."""
+        with self._lock:
+            if self._async_storage is None:
+                if self.backend == "memory":
+                    inner = hishel.AsyncInMemoryStorage(ttl=self.max_ttl, capacity=self.policy.max_entries or 128)
+                elif self.backend == "file":
+                    inner = hishel.AsyncFileStorage(base_path=self.path, ttl=self.max_ttl, check_ttl_every=10)
+                else:
+                    # checked in __init__, see the `sqlite` extra
+                    import anysqlite
+
+                    connection = anysqlite.Connection(self._sqlite_connection())
+                    inner = hishel.AsyncSQLiteStorage(connection=connection, ttl=self.max_ttl)
+                self._async_storage = AsyncPolicyStorage(inner, self.policy)
+            return self._async_storage
+
+
+# the cache of every requester of the process that is not given its own
+shared_cache = CacheConfig()
@@ -0,0 +1,361 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+import httpx
+
+from pupsis.errors import DeadlineExceeded
+from pupsis.utils.deadline import deadline_of
+
+
+class HostLimit:
+    """Concurrency window of one host.
+
+    Attributes:
+        limit (float): Requests allowed in flight, the integer part is used.
+        in_flight (int): Requests sent and not answered yet.
+        baseline (float): Latency of the host when it is not loaded, None before the first response.
+        decreased (float): `time.monotonic()` of the last decrease.
+    """
+
+    __slots__ = ("limit", "in_flight", "baseline", "decreased", "waiters")
+
+    def __init__(self, limit: float):
+        self.limit = limit
+        self.in_flight = 0
+        self.baseline = None
+        self.decreased = 0.0
+        self.waiters = deque()
+
+
+class AdaptiveLimiter:
+    """Adapts the number of requests in flight per host to how SIS answers (AIMD).
+
+    Each healthy response adds `1 / limit` to the window of its host, so the
+    window grows by about one request per round trip while SIS keeps up. A
+    timeout, a 5xx or 429 response, or a redirect to `lockaccount` cuts the
+    window by `backoff`, at most once per `cooldown` seconds so one burst of
+    failures only counts once. Responses slower than `tolerance` times the
+    host's unloaded latency hold the window where it is.
+
+    A single limiter is shared by all requesters of a process (see
+    `shared_limiter`), sync and async requesters wait for the same slots.
+
+    Attributes:
+        initial (int): Window of a host before any response.
+        minimum (int): Smallest window, SIS is never sent fewer requests at once.
+        maximum (int): Largest window.
+        backoff (float): Factor applied to the window on a failure.
+        tolerance (float): Latency above this multiple of the unloaded latency stops the growth.
+        cooldown (float): Seconds between two decreases of the same host.
+
+    Example:
+    >>> from pupsis.utils.limiter import shared_limiter
+    >>> shared_limiter.configure(maximum=8, backoff=0.5)
+    >>> shared_limiter.limits()
+    {'sis8.pup.edu.ph': 5.2}
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        minimum: int = 1,
+        maximum: int = 32,
+        backoff: float = 0.5,
+        tolerance: float = 2.0,
+        cooldown: float = 1.0,
+    ):
+        self._lock = threading.Lock()
+        self._hosts = {}
+        self.configure(
+            initial=initial, minimum=minimum, maximum=maximum, backoff=backoff, tolerance=tolerance, cooldown=cooldown
+        )
+
+    def configure(
+        self,
+        initial: Optional[int] = None,
+        minimum: Optional[int] = None,
+        maximum: Optional[int] = None,
+        backoff: Optional[float] = None,
+        tolerance: Optional[float] = None,
+        cooldown: Optional[float] = None,
+    ):
+        """Changes the settings, the window of every host starts over from `initial`."""
+        if minimum is not None and minimum < 1:
+            raise ValueError(f"minimum must be at least 1, got {minimum}")
+        if backoff is not None and not 0 < backoff < 1:
+            raise ValueError(f"backoff must be between 0 and 1, got {backoff}")
+
+        with self._lock:
+            if initial is not None:
+                self.initial = initial
+            if minimum is not None:
+                self.minimum = minimum
+            if maximum is not None:
+                self.maximum = maximum
+            if backoff is not None:
+                self.backoff = backoff
+            if tolerance is not None:
+                self.tolerance = tolerance
+            if cooldown is not None:
+                self.cooldown = cooldown
+            if self.maximum < self.minimum:
+                raise ValueError(f"maximum ({self.maximum}) is smaller than minimum ({self.minimum})")
+            for host in self._hosts.values():
+                host.limit = self._clamp(self.initial)
+                self._wake(host)
+
+    def limits(self) -> dict:
+        """Current window per host."""
+        with self._lock:
+            return {name: round(host.limit, 2) for name, host in self._hosts.items()}
+
+    def _clamp(self, limit: float) -> float:
+        return min(max(limit, self.minimum), self.maximum)
+
+    def _host(self, name: str) -> HostLimit:
+        host = self._hosts.get(name)
+        if host is None:
+            host = self._hosts[name] = HostLimit(self._clamp(self.initial))
+        return host
+
+    def _try_acquire(self, host: HostLimit) -> bool:
+        if host.in_flight < int(host.limit) and not host.waiters:
+            host.in_flight += 1
+            return True
+        return False
+
+    def _wake(self, host: HostLimit):
+        """Hands free slots to the waiters in arrival order, called with the lock held."""
+        while host.waiters and host.in_flight < int(host.limit):
+            wake = host.waiters.popleft()
+            if wake():
+                host.in_flight += 1
+
+    def acquire(self, name: str, timeout: Optional[float] = None) -> float:
+        """Blocks until a request to `name` may be sent, returns the time waited.
+
+        Raises:
+            TimeoutError: If no slot was free within `timeout` seconds.
+        """
+        with self._lock:
+            host = self._host(name)
+            if self._try_acquire(host):
+                return 0.0
+            start = time.monotonic()
+            event = threading.Event()
+            granted = []
+
+            def wake():
+                if event.is_set():
+                    return False  # gave up waiting
+                granted.append(True)
+                event.set()
+                return True
+
+            host.waiters.append(wake)
+
+        event.wait(timeout)
+        with self._lock:
+            if not granted:
+                event.set()
+                if wake in host.waiters:
+                    host.waiters.remove(wake)
+                raise TimeoutError(f"No request slot for {name} within {timeout}s")
+        return time.monotonic() - start
+
+    async def async_acquire(self, name: str, timeout: Optional[float] = None) -> float:
+        """Asyncio version of `acquire`."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            host = self._host(name)
+            if self._try_acquire(host):
+                return 0.0
+            start = time.monotonic()
+            future = loop.create_future()
+
+            def grant():
+                if not future.done():
+                    future.set_result(None)
+                else:
+                    # cancelled after the slot was handed over
+                    self.release(name)
+
+            def wake():
+                if future.done():
+                    return False
+                loop.call_soon_threadsafe(grant)
+                return True
+
+            host.waiters.append(wake)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            with self._lock:
+                if future.done():
+                    # the slot arrived together with the cancellation
+                    self._release(host)
+                else:
+                    future.cancel()
+                    if wake in host.waiters:
+                        host.waiters.remove(wake)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise TimeoutError(f"No request slot for {name} within {timeout}s") from None
+        return time.monotonic() - start
+
+    def _release(self, host: HostLimit):
+        host.in_flight -= 1
+        self._wake(host)
+
+    def release(self, name: str):
+        """Frees the slot of a request that ended without a response to judge."""
+        with self._lock:
+            self._release(self._host(name))
+
+    def record(self, name: str, latency: Optional[float], failed: bool):
+        """Frees the slot of a finished request and adapts the window of its host.
+
+        Attributes:
+            name (str): Host the request went to.
+            latency (float): Seconds the response took, None for a request that failed without one.
+            failed (bool): The request timed out or SIS answered with an overload or lockout signal.
+        """
+        with self._lock:
+            host = self._host(name)
+            now = time.monotonic()
+            if failed:
+                if now - host.decreased >= self.cooldown:
+                    host.limit = self._clamp(host.limit * self.backoff)
+                    host.decreased = now
+            elif latency is not None:
+                if host.baseline is None or latency < host.baseline:
+                    host.baseline = latency
+                else:
+                    # drifts up slowly, a mirror that got slower for good is not loaded forever
+                    host.baseline += (latency - host.baseline) * 0.01
+                if latency <= host.baseline * self.tolerance:
+                    host.limit = self._clamp(host.limit + 1 / host.limit)
+            self._release(host)
+
+
+# the request windows of every requester of the process
+shared_limiter = AdaptiveLimiter()
+
+
+def is_overloaded(response: httpx.Response) -> bool:
+    """Whether the response tells the client to back off: 429, 5xx, or a redirect to `lockaccount`."""
+    if response.status_code == 429 or response.status_code >= 500:
+        return True
+    redirect = response.headers.get("Location", "") + response.headers.get("Refresh", "")
+    return "lockaccount" in redirect
+
+
+def _slot_timeout(request: httpx.Request) -> tuple:
+    """The longest wait for a slot, and whether the request's `Deadline` rather than the pool timeout set it."""
+    timeout = request.extensions.get("timeout", {}).get("pool")
+    deadline = deadline_of(request)
+    if deadline is not None:
+        remaining = max(deadline.remaining(), 0.0)
+        if timeout is None or remaining < timeout:
+            return remaining, True
+    return timeout, False
+
+
+def _cap_timeouts(request: httpx.Request):
+    """Shortens the timeouts of a request to what the waits for the pacer and a slot left of its `Deadline`."""
+    deadline = deadline_of(request)
+    if deadline is not None:
+        remaining = max(deadline.remaining(), 0.001)
+        timeouts = request.extensions.get("timeout", {})
+        request.extensions["timeout"] = {
+            name: remaining if value is None else min(value, remaining) for name, value in timeouts.items()
+        }
+
+
+def _slot_timed_out(request: httpx.Request, error: TimeoutError, by_deadline: bool) -> Exception:
+    if by_deadline:
+        return DeadlineExceeded(deadline_of(request).seconds, f"waiting for a request slot to {request.url.host}")
+    return httpx.PoolTimeout(str(error), request=request)
+
+
+class LimitedTransport(httpx.BaseTransport):
+    """Transport that takes a request slot of the limiter before every network request.
+
+    Sits below the hishel cache transport, so cache hits never reach it.
+    Waiting for a slot longer than the pool timeout raises `httpx.PoolTimeout`,
+    longer than what is left of the request's `Deadline` raises `DeadlineExceeded`.
+    The `pupsis_sent` extension of the request holds the `time.perf_counter()`
+    it was handed to the network, after the waits of the pacer and the limiter.
+    """
+
+    def __init__(self, transport: httpx.BaseTransport, limiter: AdaptiveLimiter, logger=None):
+        self.transport = transport
+        self.limiter = limiter
+        self.logger = logger
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        timeout, by_deadline = _slot_timeout(request)
+        try:
+            wait = self.limiter.acquire(host, timeout)
+        except TimeoutError as e:
+            raise _slot_timed_out(request, e, by_deadline) from None
+        if wait > 0 and self.logger is not None:
+            self.logger.debug("Waited %.2fs for a request slot to %s", wait, host)
+        _cap_timeouts(request)
+
+        start = time.monotonic()
+        request.extensions["pupsis_sent"] = time.perf_counter()
+        try:
+            response = self.transport.handle_request(request)
+        except httpx.TimeoutException:
+            self.limiter.record(host, None, failed=True)
+            raise
+        except BaseException:
+            self.limiter.release(host)
+            raise
+        self.limiter.record(host, time.monotonic() - start, failed=is_overloaded(response))
+        return response
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncLimitedTransport(httpx.AsyncBaseTransport):
+    """Asyncio version of `LimitedTransport`."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, limiter: AdaptiveLimiter, logger=None):
+        self.transport = transport
+        self.limiter = limiter
+        self.logger = logger
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        timeout, by_deadline = _slot_timeout(request)
+        try:
+            wait = await self.limiter.async_acquire(host, timeout)
+        except TimeoutError as e:
+            raise _slot_timed_out(request, e, by_deadline) from None
+        if wait > 0 and self.logger is not None:
+            self.logger.debug("Waited %.2fs for a request slot to %s", wait, host)
+        _cap_timeouts(request)
+
+        start = time.monotonic()
+        request.extensions["pupsis_sent"] = time.perf_counter()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except httpx.TimeoutException:
+            self.limiter.record(host, None, failed=True)
+            raise
+        except BaseException:
+            self.limiter.release(host)
+            raise
+        self.limiter.record(host, time.monotonic() - start, failed=is_overloaded(response))
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
@@ -1,68 +1,193 @@
+import atexit
+import copy
+import json
 import logging
-import warnings
-from colorama import Fore, Style, init
+import queue
+import threading
+from typing import Optional
 
-# Initialize colorama for Windows compatibility
-init(autoreset=True)
 
-class Logger(logging.Logger):
-    def __init__(self, name, level=None, log_file=None):
-        if level is None:
-            self.disabled = True  # Disable logging if level is None
-            return
+COLOR_MAP = {
+    "INFO": "CYAN",
+    "DEBUG": "GREEN",
+    "WARNING": "YELLOW",
+    "ERROR": "RED",
+    "CRITICAL": "MAGENTA",
+}
+
+
+class ColorFormatter(logging.Formatter):
+    """Applies color to the message based on the log level.
+
+    colorama is imported when the console handler is created, not with the package.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        from colorama import Fore, Style, just_fix_windows_console
+
+        # Enable ANSI colors on Windows consoles
+        just_fix_windows_console()
+        self.colors = {level: getattr(Fore, color) for level, color in COLOR_MAP.items()}
+        self.reset = Style.RESET_ALL
+
+    def formatMessage(self, record):
+        record.message = f"{self.colors.get(record.levelname, '')}{record.message}{self.reset}"
+        return super().formatMessage(record)
+
 
-        super().__init__(name, level)
-        self.extra_info = None
-
-        # Console handler with color formatting
-        stream_handler = logging.StreamHandler()
-        formatter = logging.Formatter('[%(levelname)s - %(asctime)s] - %(message)s')
-        stream_handler.setFormatter(formatter)
-        self.addHandler(stream_handler)
-
-        # File handler (optional, without colors)
-        if log_file:
-            file_handler = logging.FileHandler(log_file)
-            file_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-            file_handler.setFormatter(file_formatter)
-            self.addHandler(file_handler)
-
-    def format_message(self, level, msg):
-        """Applies color based on log level"""
-        color_map = {
-            "INFO": Fore.CYAN,
-            "DEBUG": Fore.GREEN,
-            "WARNING": Fore.YELLOW,
-            "ERROR": Fore.RED,
-            "CRITICAL": Fore.MAGENTA,
+class JSONFormatter(logging.Formatter):
+    """Formats records as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
         }
-        color = color_map.get(level, "")
-        return f"{color}{msg}{Style.RESET_ALL}"
+        return json.dumps(entry, ensure_ascii=False)
 
-    def info(self, msg, *args, **kwargs):
-        if self.disabled:
-            return
-        super().info(self.format_message("INFO", msg), *args, **kwargs)
 
-    def debug(self, msg, *args, **kwargs):
-        if self.disabled:
-            return
-        super().debug(self.format_message("DEBUG", msg), *args, **kwargs)
+class SinkHandler(logging.Handler):
+    """Formats the message in the calling thread and queues it for the sinks of its logger.
 
-    def warning(self, msg, *args, **kwargs):
-        """Logs a warning message in yellow and also issues a Python warning."""
-        if self.disabled:
-            return
-        warnings.warn(msg, UserWarning)  # Issue a Python warning
-        super().warning(self.format_message("WARNING", msg), *args, **kwargs)
+    Works like `logging.handlers.QueueHandler`, the queued record holds the
+    final message and no arguments or traceback objects.
+    """
 
-    def error(self, msg, *args, **kwargs):
- 
-        if self.disabled:
-            return
-        super().error(self.format_message("ERROR", msg), *args, **kwargs)
+    def __init__(self, log_queue, sinks: tuple):
+        super().__init__()
+        self.queue = log_queue
+        self.sinks = sinks
+
+    def emit(self, record):
+        try:
+            message = self.format(record)
+            record = copy.copy(record)
+            record.message = record.msg = message
+            record.args = record.exc_info = record.exc_text = record.stack_info = None
+            record.pupsis_sinks = self.sinks
+            self.queue.put_nowait(record)
+        except Exception:
+            self.handleError(record)
+
+
+class SinkRouter(logging.Handler):
+    """Runs on the listener thread and writes each record to the sinks it was queued for."""
+
+    def handle(self, record):
+        for sink in record.pupsis_sinks:
+            pipeline.sink(sink).handle(record)
+        return True
+
+
+class Pipeline:
+    """The logging handlers shared by every `Logger` of the process.
+
+    Loggers only put records on a queue, a background `QueueListener` writes
+    them to the console and to log files, so a fetch never waits on disk or
+    terminal I/O. There is one console handler and one handler per log file,
+    however many loggers use them.
 
-    def critical(self, msg, *args, **kwargs):
-        if self.disabled:
+    Attributes:
+        json (bool): Write JSON lines instead of text.
+    """
+
+    def __init__(self):
+        self.json = False
+        self.queue = queue.SimpleQueue()
+        self.listener = None
+        self.sinks = {}
+        self.handlers = {}
+        self.lock = threading.Lock()
+
+    def configure(self, json: Optional[bool] = None):
+        """Changes the output format of every sink, existing and future."""
+        with self.lock:
+            if json is not None:
+                self.json = json
+            for key, handler in self.sinks.items():
+                handler.setFormatter(self.formatter(key))
+
+    def formatter(self, sink: Optional[str]):
+        if self.json:
+            return JSONFormatter()
+        if sink is None:
+            return ColorFormatter("[%(levelname)s - %(asctime)s] - %(message)s")
+        # log files are written without colors
+        return logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+
+    def sink(self, key: Optional[str]):
+        """The console handler for None, otherwise the handler of the log file `key`."""
+        handler = self.sinks.get(key)
+        if handler is None:
+            with self.lock:
+                handler = self.sinks.get(key)
+                if handler is None:
+                    handler = logging.StreamHandler() if key is None else logging.FileHandler(key, delay=True)
+                    handler.setFormatter(self.formatter(key))
+                    self.sinks[key] = handler
+        return handler
+
+    def handler(self, log_file: Optional[str] = None):
+        """The queue handler of loggers writing to the console and `log_file`."""
+        sinks = (None,) if log_file is None else (None, log_file)
+        with self.lock:
+            if self.listener is None:
+                from logging.handlers import QueueListener
+
+                self.listener = QueueListener(self.queue, SinkRouter())
+                self.listener.start()
+                atexit.register(self.stop)
+            handler = self.handlers.get(sinks)
+            if handler is None:
+                handler = self.handlers[sinks] = SinkHandler(self.queue, sinks)
+        return handler
+
+    def stop(self):
+        """Writes out the queued records and stops the background thread."""
+        with self.lock:
+            listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.stop()
+        for handler in list(self.sinks.values()):
+            handler.flush()
+
+
+pipeline = Pipeline()
+
+
+def configure(json: Optional[bool] = None):
+    """Process-wide logging options.
+
+    Attributes:
+        json (bool): Write structured JSON lines to the console and log files.
+
+    Example:
+    >>> from pupsis.utils import logs
+    >>> logs.configure(json=True)
+    """
+    pipeline.configure(json=json)
+
+
+class Logger(logging.Logger):
+    """Logger of the pupsis classes.
+
+    Messages take %-style arguments and are only formatted when the level is
+    enabled. Records are written by the shared background pipeline.
+
+    Attributes:
+        name (str): Name of the logger.
+        level (str): The logging level, None disables the logger.
+        log_file (str): Also write the records to this file.
+    """
+
+    def __init__(self, name, level=None, log_file=None):
+        super().__init__(name, level or logging.NOTSET)
+        if level is None:
+            self.disabled = True  # Disable logging if level is None
             return
-        super().critical(self.format_message("CRITICAL", msg), *args, **kwargs)
+
+        self.propagate = False
+        self.addHandler(pipeline.handler(log_file))
@@ -0,0 +1,261 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+
+# upper bounds in seconds, SIS answers anywhere from tens of milliseconds to a minute
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HELP = {
+    "pupsis_request_duration_seconds": "Time from sending a request to SIS to receiving the full response.",
+    "pupsis_queue_wait_seconds": "Time a request waited for the request pacer and a limiter slot before going to SIS.",
+    "pupsis_requests_total": "Responses received, by mirror, endpoint and status.",
+    "pupsis_request_failures_total": "Requests that failed with a connection error, a timeout or an error status.",
+    "pupsis_retries_total": "Requests sent again, to the same or another mirror, after a failed attempt.",
+    "pupsis_response_bytes_total": "Response body bytes received from SIS.",
+    "pupsis_cache_hits_total": "Responses served from the HTTP cache.",
+    "pupsis_cache_misses_total": "Responses that had to be fetched from SIS.",
+    "pupsis_cache_hit_ratio": "Share of responses served from the HTTP cache.",
+    "pupsis_logins_total": "Login attempts by outcome.",
+    "pupsis_step_duration_seconds": "Duration of the login, CSRF and page fetch steps.",
+    "pupsis_parse_duration_seconds": "Time spent parsing grades and schedule pages.",
+}
+
+
+class Histogram:
+    """Counts of observed values per bucket, with their sum.
+
+    Attributes:
+        buckets (tuple): Upper bounds of the buckets, a last `+Inf` bucket is implied.
+        counts (list): Observations per bucket, not cumulative.
+        sum (float): Sum of the observed values.
+        count (int): Number of observed values.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimates the `q` quantile (0-1) from the buckets, None without observations."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.counts)),
+        }
+
+
+class Metrics:
+    """Counters and latency histograms of the requests and parsers.
+
+    Requesters feed it from httpx event hooks and from timers around the
+    login and fetch steps, `PUPSIS` times the parsers. The values are read
+    with `snapshot()`, exported with `prometheus()`, or pushed to callbacks
+    as they are recorded.
+
+    Attributes:
+        buckets (tuple): Histogram bucket upper bounds in seconds.
+        counters (dict): `{(name, labels): value}`.
+        histograms (dict): `{(name, labels): Histogram}`.
+
+    Example:
+    >>> metrics = Metrics()
+    >>> metrics.subscribe(lambda name, value, labels: print(name, value, labels))
+    >>> student = PUPSIS(..., metrics=metrics)
+    >>> student.grades()
+    >>> print(metrics.prometheus())
+    """
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counters = {}
+        self.histograms = {}
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[str, float, dict], None]):
+        """Calls `callback(name, value, labels)` for every counter increment and observation."""
+        self._callbacks.append(callback)
+
+    def unsubscribe(self, callback: Callable[[str, float, dict], None]):
+        self._callbacks.remove(callback)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+        self._notify(name, value, labels)
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+        self._notify(name, value, labels)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Observes the seconds spent in the block, also when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def _notify(self, name: str, value: float, labels: dict):
+        for callback in self._callbacks:
+            callback(name, value, labels)
+
+    def value(self, name: str, **labels) -> float:
+        """Sum of a counter over the series matching `labels`."""
+        wanted = set(labels.items())
+        with self._lock:
+            return sum(v for (n, series), v in self.counters.items() if n == name and wanted <= set(series))
+
+    @property
+    def cache_hit_ratio(self) -> Optional[float]:
+        hits = self.value("pupsis_cache_hits_total")
+        total = hits + self.value("pupsis_cache_misses_total")
+        return hits / total if total else None
+
+    def snapshot(self) -> dict:
+        """The current values, as `{name: [{"labels", "value"}]}` with histograms summarised."""
+        result = {}
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                result.setdefault(name, []).append({"labels": dict(labels), "value": value})
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                result.setdefault(name, []).append({"labels": dict(labels), "value": histogram.as_dict()})
+        ratio = self.cache_hit_ratio
+        if ratio is not None:
+            result["pupsis_cache_hit_ratio"] = [{"labels": {}, "value": ratio}]
+        return result
+
+    def prometheus(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, (list(h.counts), h.sum, h.count)) for key, h in self.histograms.items())
+
+        described = set()
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            describe(name, "counter")
+            lines.append(f"{name}{format_labels(labels)} {value!r}")
+        for (name, labels), (counts, total, count) in histograms:
+            describe(name, "histogram")
+            cumulative = 0
+            for bound, bucket_count in zip([*map(repr, self.buckets), "+Inf"], counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(labels)} {total!r}")
+            lines.append(f"{name}_count{format_labels(labels)} {count}")
+
+        ratio = self.cache_hit_ratio
+        if ratio is not None:
+            describe("pupsis_cache_hit_ratio", "gauge")
+            lines.append(f"pupsis_cache_hit_ratio {ratio!r}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def request_hooks(self):
+        """httpx event hooks recording the latency, status, bytes and cache use of each response."""
+        return {"request": [self._on_request], "response": [self._on_response]}
+
+    def async_request_hooks(self):
+        """`request_hooks` for an `httpx.AsyncClient`."""
+        async def on_request(request):
+            self._on_request(request)
+
+        async def on_response(response):
+            await response.aread()
+            self._record_response(response)
+
+        return {"request": [on_request], "response": [on_response]}
+
+    @staticmethod
+    def _on_request(request):
+        request.extensions["pupsis_start"] = time.perf_counter()
+
+    def _on_response(self, response):
+        response.read()
+        self._record_response(response)
+
+    def _record_response(self, response):
+        request = response.request
+        labels = {"mirror": request.url.host, "endpoint": endpoint_of(request.url.path)}
+        if response.extensions.get("from_cache"):
+            self.inc("pupsis_cache_hits_total", endpoint=labels["endpoint"])
+            return
+        self.inc("pupsis_cache_misses_total", endpoint=labels["endpoint"])
+        # stamped by `LimitedTransport` once the pacer and limiter let the request go
+        sent = request.extensions.get("pupsis_sent")
+        if sent is not None:
+            start = request.extensions.get("pupsis_start")
+            if start is not None:
+                self.observe("pupsis_queue_wait_seconds", sent - start, mirror=labels["mirror"])
+            self.observe("pupsis_request_duration_seconds", time.perf_counter() - sent, **labels)
+        self.inc("pupsis_requests_total", status=str(response.status_code), method=request.method, **labels)
+        self.inc("pupsis_response_bytes_total", len(response.content), mirror=labels["mirror"])
+
+
+def endpoint_of(path: str) -> str:
+    """SIS endpoint of a URL path, "/student/grades" gives "grades", the login page gives "login"."""
+    return path.rstrip("/").rsplit("/student", 1)[-1].strip("/") or "login"
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{escape_label(value)}"' for key, value in labels) + "}"
+
+
+def mirror_of(url: str) -> str:
+    """Host name of a mirror URL, the label used by the request metrics."""
+    return urlsplit(url).hostname or url
+
+
+# the metrics of every requester of the process, unless one is given
+shared_metrics = Metrics()
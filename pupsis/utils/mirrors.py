@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+
+DEFAULT_MIRRORS = [
+    "https://sis8.pup.edu.ph/student/",
+    "https://sis1.pup.edu.ph/student/",
+    "https://sis2.pup.edu.ph/student/",
+]
+
+
+class MirrorHealth:
+    """Recent latency and error record of one SIS mirror.
+
+    Attributes:
+        latency (float): Exponentially weighted average latency in seconds, None until the first success.
+        error_rate (float): Exponentially weighted share of failed requests.
+        failures (int): Consecutive failures, resets on success.
+        opened_until (float): Monotonic time until which the circuit breaker is open.
+        samples (deque): The latest latencies, used for percentiles.
+    """
+
+    def __init__(self, window: int = 50):
+        self.latency = None
+        self.error_rate = 0.0
+        self.failures = 0
+        self.opened_until = 0.0
+        self.samples = deque(maxlen=window)
+
+    @property
+    def score(self) -> float:
+        """Lower is healthier, unmeasured mirrors score 0 so they get tried once.
+
+        A mirror that has only failed so far has no latency to score, it
+        scores infinity and goes after every mirror that answered.
+        """
+        if self.latency is None:
+            return float("inf") if self.failures or self.error_rate else 0.0
+        return self.latency * (1 + 4 * self.error_rate)
+
+    def __repr__(self):
+        return f"<MirrorHealth latency={self.latency} error_rate={self.error_rate:.2f} failures={self.failures}>"
+
+
+class MirrorPool:
+    """Routes requests to the healthiest SIS mirror.
+
+    Every request reports its outcome back to the pool. A mirror that fails
+    `failure_threshold` times in a row has its circuit opened for `cooldown`
+    seconds and is only tried after every other mirror has failed. Once the
+    cooldown ends the next request probes it again, a single failure re-opens
+    the circuit. The pool is shared by all requesters of a process (see
+    `shared_mirrors`).
+
+    Attributes:
+        urls (list): The base URLs of the mirrors, in order of preference.
+        failure_threshold (int): Consecutive failures that open the circuit.
+        cooldown (float): Seconds a circuit stays open.
+        alpha (float): Weight of the newest sample in the latency and error averages.
+        window (int): Number of latency samples kept for percentiles.
+    """
+
+    def __init__(
+        self,
+        urls: Optional[list] = None,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        alpha: float = 0.3,
+        window: int = 50,
+    ):
+        self.urls = list(urls or DEFAULT_MIRRORS)
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.alpha = alpha
+        self.health = {url: MirrorHealth(window) for url in self.urls}
+        self._lock = threading.Lock()
+
+    def is_open(self, url: str) -> bool:
+        """Checks if the circuit breaker of a mirror is open."""
+        return self.health[url].opened_until > time.monotonic()
+
+    def ordered(self) -> list:
+        """Returns the mirrors healthiest first, mirrors with an open circuit last."""
+        with self._lock:
+            return sorted(
+                self.urls,
+                key=lambda url: (self.is_open(url), self.health[url].score, self.health[url].error_rate),
+            )
+
+    def mirror_for_host(self, host: str) -> Optional[str]:
+        """Returns the mirror URL served from `host`, if any."""
+        for url in self.urls:
+            if url.split("/")[2] == host:
+                return url
+        return None
+
+    def record_success(self, url: str, latency: float):
+        with self._lock:
+            health = self.health[url]
+            health.samples.append(latency)
+            health.latency = latency if health.latency is None else (
+                self.alpha * latency + (1 - self.alpha) * health.latency
+            )
+            health.error_rate *= 1 - self.alpha
+            health.failures = 0
+            health.opened_until = 0.0
+
+    def record_failure(self, url: str):
+        with self._lock:
+            health = self.health[url]
+            health.error_rate = self.alpha + (1 - self.alpha) * health.error_rate
+            health.failures += 1
+            if health.failures >= self.failure_threshold:
+                health.opened_until = time.monotonic() + self.cooldown
+
+    def percentile(self, url: str, percentile: float) -> Optional[float]:
+        """Returns a latency percentile (0-100) of a mirror, None without samples."""
+        with self._lock:
+            samples = sorted(self.health[url].samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * percentile / 100))
+        return samples[index]
+
+
+# one health record of the SIS mirrors for every requester of the process
+shared_mirrors = MirrorPool()
@@ -0,0 +1,175 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Optional
+
+import httpx
+
+from pupsis.errors import DeadlineExceeded
+from pupsis.utils.deadline import deadline_of
+
+
+class TokenBucket:
+    """A token bucket that hands out request slots at a fixed rate.
+
+    Callers reserve a slot and get back how long to wait for it, the bucket
+    itself never sleeps, so the same bucket serves threads and event loops.
+
+    Attributes:
+        rate (float): Tokens added per second.
+        burst (int): Maximum number of tokens, i.e requests allowed back to back.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def reserve(self, limit: Optional[float] = None) -> Optional[float]:
+        """Takes one token and returns the seconds to wait before using it.
+
+        Returns None without taking the token if the wait would be longer than `limit`.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        wait = max(1 - self.tokens, 0.0) / self.rate
+        if limit is not None and wait > limit:
+            return None
+        self.tokens -= 1
+        return wait
+
+
+class RequestPacer:
+    """Paces requests with one token bucket per host.
+
+    Only requests that go out to the network are paced, responses served by the
+    HTTP cache skip it. A single pacer is shared by all requesters of a process
+    (see `shared_pacer`), so the load put on SIS is `rate` requests per second
+    per mirror, with up to `burst` requests sent without waiting.
+
+    Attributes:
+        rate (float): Requests per second allowed per host.
+        burst (int): Requests allowed back to back before pacing starts.
+        jitter (float): Upper bound of a random delay added to every paced wait.
+
+    Example:
+    >>> from pupsis.utils.pacer import shared_pacer
+    >>> shared_pacer.configure(rate=0.5, burst=2, jitter=0.5)
+    """
+
+    def __init__(self, rate: float = 1.0, burst: int = 2, jitter: float = 0.25):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self.configure(rate=rate, burst=burst, jitter=jitter)
+
+    def configure(self, rate: Optional[float] = None, burst: Optional[int] = None, jitter: Optional[float] = None):
+        """Changes the budget, the buckets of every host start over from a full burst."""
+        if rate is not None and rate <= 0:
+            raise ValueError(f"rate must be greater than 0, got {rate}")
+        if burst is not None and burst < 1:
+            raise ValueError(f"burst must be at least 1, got {burst}")
+
+        with self._lock:
+            if rate is not None:
+                self.rate = rate
+            if burst is not None:
+                self.burst = burst
+            if jitter is not None:
+                self.jitter = jitter
+            self._buckets.clear()
+
+    def delay(self, host: str, timeout: Optional[float] = None) -> float:
+        """Reserves a request slot for `host` and returns the seconds to wait for it.
+
+        Raises:
+            TimeoutError: If the next slot is more than `timeout` seconds away, no slot is reserved then.
+        """
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+            wait = bucket.reserve(timeout)
+        if wait is None:
+            raise TimeoutError(f"No request slot for {host} within {timeout:.2f}s")
+
+        if wait > 0 and self.jitter > 0:
+            wait += random.uniform(0, self.jitter)
+            if timeout is not None:
+                wait = min(wait, timeout)
+        return wait
+
+    def wait(self, host: str, timeout: Optional[float] = None) -> float:
+        """Blocks until a request to `host` may be sent, returns the time waited.
+
+        Raises:
+            TimeoutError: If the next slot is more than `timeout` seconds away.
+        """
+        wait = self.delay(host, timeout)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def async_wait(self, host: str, timeout: Optional[float] = None) -> float:
+        """Asyncio version of `wait`."""
+        wait = self.delay(host, timeout)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+# one request budget for every requester of the process
+shared_pacer = RequestPacer()
+
+
+class PacedTransport(httpx.BaseTransport):
+    """Transport that waits for the pacer before every network request.
+
+    Sits below the hishel cache transport, so cache hits never reach it.
+    A wait longer than what is left of the request's `Deadline` raises
+    `DeadlineExceeded` at once instead of sleeping past it.
+    """
+
+    def __init__(self, transport: httpx.BaseTransport, pacer: RequestPacer, logger=None):
+        self.transport = transport
+        self.pacer = pacer
+        self.logger = logger
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        deadline = deadline_of(request)
+        timeout = None if deadline is None else max(deadline.remaining(), 0.0)
+        try:
+            wait = self.pacer.wait(request.url.host, timeout)
+        except TimeoutError:
+            raise DeadlineExceeded(deadline.seconds, f"waiting for the request pacer of {request.url.host}") from None
+        if wait > 0 and self.logger is not None:
+            self.logger.debug("Delayed request to %s for %.2fs", request.url.host, wait)
+        return self.transport.handle_request(request)
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncPacedTransport(httpx.AsyncBaseTransport):
+    """Asyncio version of `PacedTransport`."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, pacer: RequestPacer, logger=None):
+        self.transport = transport
+        self.pacer = pacer
+        self.logger = logger
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        deadline = deadline_of(request)
+        timeout = None if deadline is None else max(deadline.remaining(), 0.0)
+        try:
+            wait = await self.pacer.async_wait(request.url.host, timeout)
+        except TimeoutError:
+            raise DeadlineExceeded(deadline.seconds, f"waiting for the request pacer of {request.url.host}") from None
+        if wait > 0 and self.logger is not None:
+            self.logger.debug("Delayed request to %s for %.2fs", request.url.host, wait)
+        return await self.transport.handle_async_request(request)
+
+    async def aclose(self):
+        await self.transport.aclose()
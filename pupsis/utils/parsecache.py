@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+
+# bump when the parsers change what they extract, old disk entries are then ignored
+RECORD_VERSION = b"pupsis-rec-1"
+
+
+class ParseCache:
+    """Caches parsed `Grade`/`Schedule` results by a hash of the page.
+
+    A page seen before skips parsing completely. Results are kept in a
+    bounded in-memory LRU and, when `path` is set, in compact JSON files that
+    are shared between processes and runs.
+
+    Attributes:
+        maxsize (int): Number of parsed pages kept in memory.
+        path (str): Directory of the on-disk tier, None keeps the cache in memory only.
+        hits (int): Lookups answered from memory.
+        disk_hits (int): Lookups answered from disk.
+        misses (int): Lookups that had to parse the page.
+
+    Example:
+    >>> cache = ParseCache(maxsize=256, path=".cache/pupsis/parsed")
+    >>> student = PUPSIS(..., parse_cache=cache)
+    >>> student.grades()
+    >>> cache.stats()
+    """
+
+    def __init__(self, maxsize: int = 128, path: Optional[Union[str, Path]] = None):
+        self.maxsize = maxsize
+        self.path = Path(path) if path is not None else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(kind: str, html_data) -> str:
+        """Returns the cache key of a page, a BLAKE2 digest of its content."""
+        if isinstance(html_data, str):
+            html_data = html_data.encode("utf-8", "surrogatepass")
+        digest = hashlib.blake2b(html_data, digest_size=16, person=RECORD_VERSION)
+        return f"{kind}-{digest.hexdigest()}"
+
+    def fetch(self, kind: str, html_data, parse: Callable):
+        """Returns the record of a page, calling `parse()` to build it on a miss.
+
+        Attributes:
+            kind (str): The page type, i.e "grades" or "schedule".
+            html_data (str | bytes): The page.
+            parse (Callable): Parses the page and returns a JSON serializable record.
+        """
+        key = self.key(kind, html_data)
+        with self._lock:
+            record = self._entries.get(key)
+            if record is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return record
+
+        record = self._load(key)
+        if record is not None:
+            with self._lock:
+                self.disk_hits += 1
+        else:
+            record = parse()
+            with self._lock:
+                self.misses += 1
+            self._dump(key, record)
+
+        with self._lock:
+            self._entries[key] = record
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return record
+
+    def _file(self, key: str) -> Path:
+        return self.path / f"{key}.json"
+
+    def _load(self, key: str):
+        if self.path is None:
+            return None
+        try:
+            with open(self._file(key), "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _dump(self, key: str, record):
+        if self.path is None:
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._file(key).with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(record, file, separators=(",", ":"))
+        os.replace(tmp_path, self._file(key))
+
+    def clear(self):
+        """Empties the in-memory tier and resets the counters, files on disk are kept."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def stats(self) -> dict:
+        """Returns the hit/miss counters and the number of pages kept in memory."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
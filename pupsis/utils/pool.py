@@ -0,0 +1,217 @@
+import asyncio
+import atexit
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import httpx
+
+from pupsis.utils.mirrors import MirrorPool, shared_mirrors
+
+
+class SharedTransport(httpx.BaseTransport):
+    """Hands requests to the pool's transport, closing a client leaves the connections open."""
+
+    def __init__(self, pool: "ConnectionPool"):
+        self.pool = pool
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self.pool.sync_transport().handle_request(request)
+
+    def close(self):
+        pass
+
+
+class AsyncSharedTransport(httpx.AsyncBaseTransport):
+    """Asyncio version of `SharedTransport`, with one set of connections per event loop."""
+
+    def __init__(self, pool: "ConnectionPool"):
+        self.pool = pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self.pool.loop_transport().handle_async_request(request)
+
+    async def aclose(self):
+        pass
+
+
+class ConnectionPool:
+    """Keep-alive connections to the SIS mirrors, shared by every requester of the process.
+
+    A requester used to open its own connections, so each `PUPSIS` call paid
+    for a new TCP and TLS handshake. Requesters now borrow the transports of
+    one pool, closing a requester leaves the connections open for the next.
+    Asyncio connections belong to the event loop that opened them, so each
+    running loop gets its own transport.
+
+    Attributes:
+        max_connections (int): Open connections allowed at once, over all mirrors.
+        max_keepalive_connections (int): Idle connections kept open.
+        keepalive_expiry (float): Seconds an idle connection is kept open.
+        http2 (bool): Negotiate HTTP/2, needs the `h2` package (`pip install httpx[http2]`).
+
+    Example:
+    >>> shared_pool.configure(max_connections=20, http2=True)
+    >>> shared_pool.prewarm()
+    >>> with PUPSIS(...) as student:
+    ...     student.grades()
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 10,
+        max_keepalive_connections: int = 6,
+        keepalive_expiry: float = 60.0,
+        http2: bool = False,
+    ):
+        self._lock = threading.Lock()
+        self._transport = None
+        self._loop_transports = weakref.WeakKeyDictionary()
+        self.configure(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+            http2=http2,
+        )
+
+    def configure(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        http2: Optional[bool] = None,
+    ):
+        """Changes the pool settings, open connections are closed and reopened with them.
+
+        Raises:
+            ImportError: If `http2` is set and the `h2` package is not installed.
+        """
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                raise ImportError("HTTP/2 needs the h2 package, install it with `pip install httpx[http2]`.")
+
+        with self._lock:
+            if max_connections is not None:
+                self.max_connections = max_connections
+            if max_keepalive_connections is not None:
+                self.max_keepalive_connections = max_keepalive_connections
+            if keepalive_expiry is not None:
+                self.keepalive_expiry = keepalive_expiry
+            if http2 is not None:
+                self.http2 = http2
+            transport, self._transport = self._transport, None
+            # asyncio transports can only be closed on their own loop, they are dropped
+            self._loop_transports = weakref.WeakKeyDictionary()
+        if transport is not None:
+            transport.close()
+
+    @property
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def transport(self) -> SharedTransport:
+        """Transport for a sync client, borrowing the connections of the pool."""
+        return SharedTransport(self)
+
+    def async_transport(self) -> AsyncSharedTransport:
+        """Transport for an async client, borrowing the connections of the running loop."""
+        return AsyncSharedTransport(self)
+
+    def sync_transport(self) -> httpx.HTTPTransport:
+        transport = self._transport
+        if transport is None:
+            with self._lock:
+                if self._transport is None:
+                    self._transport = httpx.HTTPTransport(limits=self.limits, http2=self.http2)
+                transport = self._transport
+        return transport
+
+    def loop_transport(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        transport = self._loop_transports.get(loop)
+        if transport is None:
+            with self._lock:
+                transport = self._loop_transports.get(loop)
+                if transport is None:
+                    transport = httpx.AsyncHTTPTransport(limits=self.limits, http2=self.http2)
+                    self._loop_transports[loop] = transport
+        return transport
+
+    def prewarm(self, urls: Optional[list] = None, timeout: float = 5.0, mirrors: Optional[MirrorPool] = None):
+        """Opens a connection to each mirror ahead of the first fetch, in parallel.
+
+        Sends a HEAD request to every mirror, which also gives the mirror pool a
+        first latency sample, or records the failure of a mirror that is down.
+
+        Attributes:
+            urls (list): The mirrors to connect to, defaults to the mirrors of `mirrors`.
+            timeout (float): Seconds allowed per mirror.
+            mirrors (MirrorPool): Where to record the outcome, defaults to the pool shared by the process.
+
+        Returns:
+            dict: Seconds each mirror took to answer, None for the ones that failed.
+        """
+        mirrors = mirrors or shared_mirrors
+        urls = urls or mirrors.urls
+        with httpx.Client(transport=self.transport(), timeout=timeout) as client:
+
+            def head(url):
+                start = time.monotonic()
+                try:
+                    client.head(url)
+                except httpx.HTTPError:
+                    mirrors.record_failure(url)
+                    return None
+                return self._record(url, start, mirrors)
+
+            with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+                return dict(zip(urls, executor.map(head, urls)))
+
+    async def aprewarm(self, urls: Optional[list] = None, timeout: float = 5.0, mirrors: Optional[MirrorPool] = None):
+        """Asyncio version of `prewarm`, warms the connections of the running loop."""
+        mirrors = mirrors or shared_mirrors
+        urls = urls or mirrors.urls
+        async with httpx.AsyncClient(transport=self.async_transport(), timeout=timeout) as client:
+
+            async def head(url):
+                start = time.monotonic()
+                try:
+                    await client.head(url)
+                except httpx.HTTPError:
+                    mirrors.record_failure(url)
+                    return None
+                return self._record(url, start, mirrors)
+
+            return dict(zip(urls, await asyncio.gather(*map(head, urls))))
+
+    @staticmethod
+    def _record(url: str, start: float, mirrors: MirrorPool):
+        latency = time.monotonic() - start
+        mirrors.record_success(url, latency)
+        return latency
+
+    def close(self):
+        """Closes the connections of sync clients, the pool reopens them when used again."""
+        with self._lock:
+            transport, self._transport = self._transport, None
+        if transport is not None:
+            transport.close()
+
+    async def aclose(self):
+        """Closes the connections of the running event loop."""
+        transport = self._loop_transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+
+# the connections of every requester of the process, unless one is given
+shared_pool = ConnectionPool()
+atexit.register(shared_pool.close)
@@ -0,0 +1,176 @@
+import random
+import time
+from collections import Counter
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import httpx
+
+from pupsis.utils.deadline import Deadline
+
+
+class Attempt:
+    """One request attempt on one mirror.
+
+    Attributes:
+        url (str): The mirror the attempt went to.
+        waited (float): Seconds of backoff before the attempt.
+        elapsed (float): Seconds the attempt took.
+        outcome (str): "ok", the status code of an error response, or the name of the httpx error.
+    """
+
+    __slots__ = ("url", "waited", "elapsed", "outcome")
+
+    def __init__(self, url: str, waited: float, elapsed: float, outcome: str):
+        self.url = url
+        self.waited = waited
+        self.elapsed = elapsed
+        self.outcome = outcome
+
+    def __repr__(self):
+        return f"<Attempt {self.url} {self.outcome} waited={self.waited:.2f}s elapsed={self.elapsed:.2f}s>"
+
+
+class RetryPolicy:
+    """When and how long to wait before sending a failed request again.
+
+    A failed GET goes to the next untried mirror at once. Once every mirror
+    was tried, a mirror is retried after an exponential backoff with full
+    jitter, a random wait between 0 and `base_delay * 2 ** (tries - 1)`
+    capped at `max_delay`, or after its `Retry-After` when that is longer.
+
+    The login POST is not idempotent, a repeated one can count as a failed
+    login towards the `lockaccount` lockout. It is only sent again when SIS
+    never got it (connection errors) or refused it with one of
+    `post_statuses`.
+
+    Attributes:
+        max_attempts (int): Attempts allowed per request, over all mirrors.
+        base_delay (float): Backoff of the first retry of a mirror, in seconds.
+        max_delay (float): Largest backoff, in seconds.
+        statuses (tuple): Error statuses a GET is retried on.
+        post_statuses (tuple): Error statuses the login POST is retried on.
+        max_retry_after (float): A mirror asking to wait longer than this is not retried.
+
+    Example:
+    >>> from pupsis.utils.retry import RetryPolicy
+    >>> student = PUPSIS(..., retry=RetryPolicy(max_attempts=8, base_delay=1.0))
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 10.0,
+        statuses: tuple = (429, 500, 502, 503, 504),
+        post_statuses: tuple = (429, 503),
+        max_retry_after: float = 30.0,
+    ):
+        if max_attempts < 1:
+            raise ValueError(f"max_attempts must be at least 1, got {max_attempts}")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.statuses = statuses
+        self.post_statuses = post_statuses
+        self.max_retry_after = max_retry_after
+
+    def retryable(self, method: str, error: httpx.HTTPError) -> bool:
+        """Checks if a request that failed with `error` may be sent again."""
+        if isinstance(error, httpx.HTTPStatusError):
+            statuses = self.statuses if method == "GET" else self.post_statuses
+            return error.response.status_code in statuses
+        if method == "GET":
+            return isinstance(error, httpx.TransportError)
+        # the POST may have reached SIS unless the connection never opened
+        return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+    def backoff(self, tries: int) -> float:
+        """Full jitter wait before the next try of a mirror that failed `tries` times."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (tries - 1)))
+
+
+# the retry policy of every requester of the process, unless one is given
+default_retry = RetryPolicy()
+
+
+def retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds asked for by the `Retry-After` header, in seconds or as an HTTP date."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class Retrier:
+    """The attempts of one request, picks the mirror and the wait of the next one.
+
+    Example:
+    >>> retrier = Retrier(policy, "GET", mirrors, deadline)
+    >>> while (planned := retrier.next()) is not None:
+    ...     url, wait = planned
+    ...     time.sleep(wait)
+    ...     try:
+    ...         return send(url)
+    ...     except httpx.HTTPError as e:
+    ...         if not retrier.failed(url, wait, elapsed, e):
+    ...             break
+    """
+
+    def __init__(self, policy: RetryPolicy, method: str, urls: list, deadline: Deadline):
+        self.policy = policy
+        self.method = method
+        self.urls = urls
+        self.deadline = deadline
+        self.attempts = []
+        self.out_of_budget = False
+        self._tries = Counter()
+        self._ready = {}
+        self._skipped = set()
+
+    def next(self) -> Optional[tuple]:
+        """The `(url, seconds to wait)` of the next attempt, None when no attempt is left."""
+        if len(self.attempts) >= self.policy.max_attempts:
+            return None
+        candidates = [url for url in self.urls if url not in self._skipped]
+        if not candidates:
+            return None
+
+        untried = [url for url in candidates if not self._tries[url]]
+        if untried:
+            return untried[0], 0.0
+        url = min(candidates, key=self._ready.__getitem__)
+        wait = max(self._ready[url] - time.monotonic(), 0.0)
+        remaining = self.deadline.remaining()
+        if remaining is not None and wait >= remaining:
+            self.out_of_budget = True
+            return None
+        return url, wait
+
+    def succeeded(self, url: str, waited: float, elapsed: float):
+        self.attempts.append(Attempt(url, waited, elapsed, "ok"))
+
+    def failed(self, url: str, waited: float, elapsed: float, error: httpx.HTTPError) -> bool:
+        """Records a failed attempt, returns whether the request may be sent again."""
+        response = error.response if isinstance(error, httpx.HTTPStatusError) else None
+        outcome = str(response.status_code) if response is not None else type(error).__name__
+        self.attempts.append(Attempt(url, waited, elapsed, outcome))
+        if not self.policy.retryable(self.method, error):
+            return False
+
+        self._tries[url] += 1
+        wait = self.policy.backoff(self._tries[url])
+        asked = retry_after(response) if response is not None else None
+        if asked is not None:
+            if asked > self.policy.max_retry_after:
+                self._skipped.add(url)
+            wait = max(wait, asked)
+        self._ready[url] = time.monotonic() + wait
+        return True
@@ -11,6 +11,10 @@ setup(
         "psutil",
         "colorama"
     ],
+    extras_require={
+        "sqlite": ["hishel[sqlite]"],
+        "analytics": ["numpy"],
+    },
     entry_points={
         "console_scripts": [
             "pupsis=pupsis.cli:main",
@@ -0,0 +1,150 @@
+"""Benchmarks of the parsers and of the `PUPSIS.grades()` request path.
+
+Run as a module from the repository root, results are printed as JSON:
+
+    python3 -m tests.benchmarks --output before.json
+    python3 -m tests.benchmarks --compare before.json
+
+The network is replaced by `pupsis.testing.SISStandIn` serving generated
+pages, so the request path is measured without SIS or the internet.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import timeit
+from datetime import datetime, timezone
+
+from pupsis import PUPSIS
+from pupsis.analytics import GradeTable
+from pupsis.scrapers.grades import Grade
+from pupsis.scrapers.schedule import Schedule
+from pupsis.utils.httpcache import CacheConfig
+from pupsis.utils.mirrors import MirrorPool
+from pupsis.testing import SISStandIn
+from tests.benchmarks.generator import grades_html, schedule_html
+
+
+def student(transport):
+    return PUPSIS(
+        student_number="2020-12345-MN-0",
+        student_birthdate="1/02/2003",
+        password="benchmark",
+        loglevel="ERROR",
+        request_delay=0,
+        mirrors=MirrorPool(["https://sis8.pup.edu.ph/student/"]),
+        # never serve grades from the HTTP cache, every call goes through the transport
+        cache=CacheConfig(backend="memory", ttls={"grades": 0}),
+        transport=transport,
+    )
+
+
+def cases(semesters: int, subjects: int):
+    """Yields `(name, callable)` for one page size."""
+    grades_page = grades_html(semesters, subjects)
+    schedule_page = schedule_html(subjects)
+    parsed = Grade(grades_page)
+    semester = parsed.all()[-1]
+    transport = SISStandIn(pages={"grades": grades_page})
+    logged_in = student(transport)
+    logged_in.grades()
+
+    yield "grades.parse", lambda: Grade(grades_page)
+    yield "grades.parse_bytes", lambda: Grade(grades_page.encode())
+    yield "grades.all", lambda: Grade.from_records(grades_page, parsed.header, parsed.infos, parsed.grades).all()
+    yield "grades.latest", lambda: Grade.from_records(grades_page, parsed.header, parsed.infos, parsed.grades).latest(True)
+    yield "grades.calculate_gpa", lambda: semester.calculate_gpa()
+    # one page per student of a 500 student cohort
+    cohort = GradeTable.from_grades({number: parsed for number in range(500)})
+    yield "cohort.load", lambda: GradeTable.from_grades({number: parsed for number in range(500)})
+    yield "cohort.gpa_by_term", lambda: cohort.gpa_by_term()
+    yield "cohort.cumulative_gpa", lambda: cohort.cumulative_gpa()
+    yield "schedule.parse", lambda: Schedule(schedule_page).get_schedule()
+    yield "pupsis.grades_login", lambda: student(transport).grades()
+    yield "pupsis.grades_session", lambda: logged_in.grades()
+
+
+def measure(func, repeat: int, min_time: float):
+    """Times `func` like `timeit`, returns the seconds per call of each repeat."""
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    return number, [total / number for total in timer.repeat(repeat, number)]
+
+
+def run(sizes, repeat: int, min_time: float, only=None):
+    results = []
+    for semesters, subjects in sizes:
+        for name, func in cases(semesters, subjects):
+            if only and not any(pattern in name for pattern in only):
+                continue
+            number, timings = measure(func, repeat, min_time)
+            results.append({
+                "name": name,
+                "semesters": semesters,
+                "subjects": subjects,
+                "number": number,
+                "best": min(timings),
+                "median": statistics.median(timings),
+                "mean": statistics.fmean(timings),
+                "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+            })
+            print(f"{name:<24} {semesters:>3}x{subjects:<3} {min(timings) * 1e6:>12.1f} us", file=sys.stderr)
+    return results
+
+
+def compare(results: list, baseline_path: str):
+    """Prints the ratio of each result to the same benchmark in a previous run."""
+    with open(baseline_path) as file:
+        baseline = {(r["name"], r["semesters"], r["subjects"]): r for r in json.load(file)["results"]}
+    print(f"\n{'benchmark':<24} {'size':<7} {'before':>12} {'after':>12} {'ratio':>7}", file=sys.stderr)
+    for result in results:
+        before = baseline.get((result["name"], result["semesters"], result["subjects"]))
+        if before is None:
+            continue
+        print(
+            f"{result['name']:<24} {result['semesters']:>3}x{result['subjects']:<3} "
+            f"{before['best'] * 1e6:>10.1f}us {result['best'] * 1e6:>10.1f}us {result['best'] / before['best']:>6.2f}x",
+            file=sys.stderr,
+        )
+
+
+def size(value: str):
+    semesters, _, subjects = value.partition("x")
+    return int(semesters), int(subjects or semesters)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m tests.benchmarks", description=__doc__.splitlines()[0])
+    parser.add_argument("-s", "--size", type=size, action="append", dest="sizes",
+                        help="SEMESTERSxSUBJECTS, repeatable (default: 1x8, 8x8, 24x12)")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="timed repeats per benchmark (default: 5)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per repeat (default: 0.2)")
+    parser.add_argument("-k", dest="only", action="append", help="only run benchmarks whose name contains this")
+    parser.add_argument("-o", "--output", help="write the JSON results to a file instead of stdout")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare against")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes or [(1, 8), (8, 8), (24, 12)], args.repeat, args.min_time, args.only)
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Synthetic pupSIS pages for the benchmarks.
+
+The markup follows the saved pages in `tests/assets`, only the number of
+semesters and subjects changes, so the parsers do the same work they do on
+a real page of that size.
+"""
+import random
+
+
+SEMESTERS = ["Second", "First", "Summer"]
+SUBJECTS = [
+    ("COMP", "Computer Programming"),
+    ("COSC", "Data Structures and Algorithms"),
+    ("MATH", "Discrete Structures"),
+    ("ELEC", "BSCS Elective"),
+    ("GEED", "Purposive Communication"),
+    ("PATHFIT", "Physical Activity Towards Health and Fitness"),
+    ("CWTS", "Civic Welfare Training Service"),
+]
+FACULTY = ["DOE,JANE BUSH", "DOE,JOHN BIDEN", "JUANA,MARIA DELA CRUZ", "DAVIS,TERRY ANDREW", "ENRIQUEZ,MIKE CASTRO"]
+GRADES = ["1.00", "1.25", "1.50", "1.75", "2.00", "2.25", "2.50", "3.00"]
+DAYS = ["M/TH", "T/F", "W/S", "S/S", "M/W", "TH/SUN"]
+TIMES = ["07:30AM-10:30AM", "09:00AM-12:00PM", "01:00PM-03:00PM", "04:30PM-07:30PM", "07:30PM-09:00PM"]
+
+
+def subject(rnd: random.Random, index: int):
+    prefix, description = rnd.choice(SUBJECTS)
+    return f"{prefix} {index + 1:03d}", f"{description} {index + 1}"
+
+
+def grades_html(semesters: int = 8, subjects: int = 8, seed: int = 0, incomplete: bool = True):
+    """Returns a grades page with `semesters` cards of `subjects` rows each, newest first.
+
+    With `incomplete` the newest semester has no final grades yet, like a term in progress.
+    """
+    rnd = random.Random(seed)
+    cards = []
+    for term in range(semesters):
+        year = 2024 - term // len(SEMESTERS)
+        rows = []
+        for index in range(subjects):
+            code, description = subject(rnd, index)
+            grade = "" if incomplete and term == 0 else rnd.choice(GRADES)
+            rows.append(
+                "<tr>"
+                f"<td>{index + 1}</td><td>{code}</td><td>{description}</td><td>{rnd.choice(FACULTY)}</td>"
+                f"<td>{rnd.choice(['3.0', '2.0', '1.0'])}</td><td>{grade}</td><td>{'PASSED' if grade else ''}</td>"
+                "</tr>"
+            )
+        cards.append(
+            '<div class="card card-theme">'
+            f'<div class="card-header"><h3 class="card-title">School Year {year} - {year + 1} {SEMESTERS[term % len(SEMESTERS)]} Semester</h3></div>'
+            '<div class="card-body"><div class="row"><dl>'
+            "<dt>Student Status</dt><dd>Regular</dd><dt>Scholastic Status</dt><dd>Good Standing</dd>"
+            '</dl></div><div class="table-responsive"><table class="table">'
+            "<thead><tr><th>#</th><th>Subject Code</th><th>Description</th><th>Faculty Name</th>"
+            "<th>Units</th><th>Final Grade</th><th>Grade Status</th></tr></thead>"
+            f"<tbody>{''.join(rows)}</tbody></table></div></div></div>"
+        )
+    return f"<html><head><title>Grades - PUPSIS</title></head><body><div class=\"content\">{''.join(cards)}</div></body></html>"
+
+
+def schedule_html(subjects: int = 8, seed: int = 0):
+    """Returns a schedule page with `subjects` rows, each meeting on two days."""
+    rnd = random.Random(seed)
+    rows = []
+    for index in range(subjects):
+        code, description = subject(rnd, index)
+        lec, lab = rnd.choice([("3.0", "0.0"), ("2.0", "3.0")])
+        meeting = f"{rnd.choice(DAYS)} {rnd.choice(TIMES)}/{rnd.choice(TIMES)}"
+        rows.append(
+            "<tr>"
+            f"<td>{index + 1}</td><td>{code}</td><td>{description}</td><td>{lec}</td><td>{lab}</td><td>3.0</td>"
+            f'<td>5 - BSCS 3-1 - {meeting}<br><font class="text-xs pt-1 pb-0">Faculty: {rnd.choice(FACULTY + [""])}</font></td>'
+            "</tr>"
+        )
+    return (
+        "<html><head><title>School Year 2425 - First Semester - PUPSIS</title></head><body>"
+        '<section class="content-header"><h1>School Year 2425 - First Semester</h1></section>'
+        '<section class="content"><div class="card"><div class="card-body"><div class="table-responsive">'
+        '<table id="Subject" class="table table-bordered"><thead><tr>'
+        "<th>#</th><th>Subject Code</th><th>Description</th><th>Lec</th><th>Lab</th><th>Unit</th><th>Schedule</th>"
+        f"</tr></thead><tbody>{''.join(rows)}</tbody></table></div></div></div></section></body></html>"
+    )
@@ -0,0 +1,88 @@
+"""Cold-start import benchmark, guards the import time of the package.
+
+Each import runs in a fresh interpreter. Fails (exit status 1) when the
+median time is over its budget or when an import pulls in the HTTP stack
+or colorama before they are used:
+
+    python3 -m tests.benchmarks.imports
+    python3 -m tests.benchmarks.imports --scale 2 --output imports.json
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+
+# seconds, medians measured on a laptop are well under half of these
+CASES = [
+    ("from pupsis import PUPSIS", 0.15),
+    ("from pupsis.scrapers.grades import Grade", 0.08),
+    ("from pupsis.scrapers.schedule import Schedule", 0.08),
+    ("import pupsis.bulk", 0.1),
+]
+
+# modules that only requests and colored console logs need
+LAZY_MODULES = ["httpx", "httpcore", "hishel", "anyio", "certifi", "colorama", "pupsis.api", "logging.handlers"]
+
+PROBE = """
+import json, sys, time
+before = set(sys.modules)
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, [m for m in {lazy!r} if m in sys.modules and m not in before]]))
+"""
+
+
+def measure(statement: str, repeat: int):
+    timings, loaded = [], set()
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(statement=statement, lazy=LAZY_MODULES)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        elapsed, modules = json.loads(output)
+        timings.append(elapsed)
+        loaded.update(modules)
+    return timings, sorted(loaded)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m tests.benchmarks.imports", description=__doc__.splitlines()[0])
+    parser.add_argument("-r", "--repeat", type=int, default=7, help="fresh interpreters per import (default: 7)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply the budgets, for slow machines")
+    parser.add_argument("-o", "--output", help="write the JSON results to a file instead of stdout")
+    args = parser.parse_args(argv)
+
+    results, failed = [], False
+    for statement, budget in CASES:
+        timings, loaded = measure(statement, args.repeat)
+        budget *= args.scale
+        median = statistics.median(timings)
+        ok = median <= budget and not loaded
+        failed |= not ok
+        results.append({
+            "statement": statement,
+            "best": min(timings),
+            "median": median,
+            "budget": budget,
+            "eager_modules": loaded,
+            "ok": ok,
+        })
+        status = "ok" if ok else "FAIL"
+        extra = f"  loads {', '.join(loaded)}" if loaded else ""
+        print(f"{status:<4} {statement:<48} {median * 1e3:>7.1f} ms / {budget * 1e3:.0f} ms{extra}", file=sys.stderr)
+
+    report = {"python": sys.version.split()[0], "results": results}
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
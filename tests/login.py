@@ -0,0 +1,61 @@
+# checks of the login against the SIS stand-in, run with `python3 -m tests.login`
+
+import logging
+import time
+
+from pupsis.api import APIRequester
+from pupsis.errors import LoginError
+from pupsis.testing import SISStandIn
+from pupsis.utils.httpcache import CacheConfig
+from pupsis.utils.mirrors import MirrorPool
+
+logging.disable(logging.CRITICAL)
+
+STUDENT = ("2020-00001-MN-0", "01/01/2000", "pw")
+
+
+def requester(sis: SISStandIn, password: str = "pw"):
+    cache = CacheConfig(backend="memory", ttls={}, default_ttl=0)
+    return APIRequester(*STUDENT[:2], password, transport=sis, mirrors=MirrorPool(), cache=cache)
+
+
+def posts(sis: SISStandIn) -> int:
+    return sum(count for (_, method, _), count in sis.requests.items() if method == "POST")
+
+
+def test_wrong_password_posts_once():
+    sis = SISStandIn(accounts={STUDENT[0]: STUDENT[1:]})
+    api = requester(sis)
+    api.get_grades()
+    assert posts(sis) == 1
+
+    # the next login reuses the CSRF token of the first one
+    api.is_logged_in = False
+    api.password = "wrong"
+    try:
+        api.get_grades()
+    except LoginError:
+        pass
+    else:
+        raise AssertionError("expected a LoginError")
+    assert posts(sis) == 2
+    assert sis.logins["invalid"] == 1 and sis.logins["invalid_csrf"] == 0
+
+
+def test_stale_token_posts_again():
+    sis = SISStandIn(accounts={STUDENT[0]: STUDENT[1:]}, csrf_ttl=0.05)
+    api = requester(sis)
+    api.get_grades()
+    time.sleep(0.1)
+
+    api.is_logged_in = False
+    assert api.get_grades() is not None
+    assert posts(sis) == 3
+    assert sis.logins["invalid_csrf"] == 1 and sis.logins["success"] == 2
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"ok   {name}")
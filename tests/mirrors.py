@@ -0,0 +1,41 @@
+# checks of pupsis.utils.mirrors, run with `python3 -m tests.mirrors`
+
+import logging
+
+from pupsis.api import APIRequester
+from pupsis.testing import HostProfile, SISStandIn
+from pupsis.utils.httpcache import CacheConfig
+from pupsis.utils.mirrors import MirrorPool
+
+logging.disable(logging.CRITICAL)
+
+DEAD = "https://sis8.pup.edu.ph/student/"
+
+
+def fetch_grades(sis: SISStandIn, mirrors: MirrorPool):
+    # a new requester logs in again, nothing is served from a cache
+    cache = CacheConfig(backend="memory", ttls={}, default_ttl=0)
+    with APIRequester("2020-00001-MN-0", "01/01/2000", "pw", transport=sis, mirrors=mirrors, cache=cache) as api:
+        assert api.get_grades() is not None
+
+
+def test_dead_mirror_not_tried_first():
+    sis = SISStandIn(hosts={"sis8.pup.edu.ph": HostProfile(down=True)})
+    mirrors = MirrorPool()
+    assert mirrors.ordered()[0] == DEAD
+
+    fetch_grades(sis, mirrors)
+    assert mirrors.ordered()[-1] == DEAD
+    assert not mirrors.is_open(DEAD)
+
+    # the later logins go to the mirrors that answered, the dead one is not connected to again
+    for _ in range(3):
+        fetch_grades(sis, mirrors)
+    assert mirrors.health[DEAD].failures == 1
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"ok   {name}")
@@ -0,0 +1,71 @@
+# checks of pupsis.occupancy, run with `python3 -m tests.occupancy`
+
+from pupsis.occupancy import Cohort
+from pupsis.scrapers.schedule import Meeting, Timetable, scheduleWrapper, to_minutes
+
+
+def timetable(*classes):
+    """A timetable of `(subject_code, faculty_name, day, start, end)` classes."""
+    meetings = []
+    for code, faculty, day, start, end in classes:
+        entry = scheduleWrapper("2425 First", code, code, "BSCS 3-1", "3", "0", "3", start, end, faculty, day)
+        meetings.append(Meeting.from_wrapper(entry))
+    return Timetable(meetings)
+
+
+a = timetable(("COMP 013", "DOE,JANE", "Monday", "07:30AM", "10:30AM"), ("MATH 011", "CRUZ,JUAN", "Friday", "01:00PM", "03:00PM"))
+b = timetable(("COSC 009", "REYES,ANA", "Tuesday", "09:00AM", "12:00PM"))
+c = timetable(("COMP 013", "DOE,JANE", "Monday", "07:30AM", "10:30AM"))
+
+
+def test_shared_class_counts_once():
+    cohort = Cohort()
+    cohort.add("s1", a)
+    cohort.add("s2", c)
+    assert cohort.faculty_load() == {"DOE,JANE": 180, "CRUZ,JUAN": 120}
+    assert cohort.headcount_at("M", "08:00AM") == 2
+
+
+def test_replace_member():
+    cohort = Cohort()
+    cohort.add("s1", a)
+    cohort.add("s2", c)
+    cohort.add("s1", b)
+    assert len(cohort) == 2
+    assert cohort.faculty_load() == {"DOE,JANE": 180, "REYES,ANA": 180}
+    assert cohort.headcount_at("M", "08:00AM") == 1
+    assert cohort.headcount_at("T", "10:00AM") == 1
+    assert not cohort.union().is_busy("F", "02:00PM")
+
+    fresh = Cohort()
+    fresh.add("s1", b)
+    fresh.add("s2", c)
+    assert cohort.headcount() == fresh.headcount()
+    assert cohort.faculty == fresh.faculty
+
+
+def test_remove_member():
+    cohort = Cohort()
+    cohort.add("s1", a)
+    cohort.add("s2", b)
+    cohort.remove("s1")
+    assert cohort.faculty_load() == {"REYES,ANA": 180}
+    assert cohort.headcount_at("M", to_minutes("08:00AM")) == 0
+    assert cohort.common_free("T", "07:00AM", "01:00PM") == [(420, 540), (720, 780)]
+
+
+
+def test_empty_window():
+    cohort = Cohort()
+    cohort.add("s1", a)
+    assert cohort.common_free("M", "05:00PM", "07:00AM") == []
+    assert cohort.common_free("M", "10:00AM", "10:00AM") == []
+    assert cohort.union().free("F", 600, 600, min_length=0) == []
+    assert a.free("M", "05:00PM", "07:00AM") == []
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"ok   {name}")